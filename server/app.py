@@ -1,27 +1,97 @@
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Depends, Header, HTTPException, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from datetime import timedelta
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+from pymongo.errors import DuplicateKeyError
 import pandas as pd
-import numpy as np
 import xgboost as xgb
-import cv2
-import tempfile
 import warnings
-import httpx
+import asyncio
+import hmac
+import io
+import ipaddress
+import json
+import math
 import os
-import random   # ✅ NEW
+import tempfile
+import time
+import zipfile
 
 # Local imports (keep these files as they are in your project)
-from database import users_collection
-from auth import get_password_hash, verify_password, create_access_token, verify_token
+from database import users_collection, ensure_indexes, check_database, audit_log, AUDIT_SHUTDOWN_TIMEOUT
+from auth import get_password_hash, verify_password, create_access_token, verify_token, token_service
 import schemas
+from cache import AsyncTTLCache, LRUCache
+from http_client import get_http_client, close_http_client
+from workers import BoundedExecutor, ExecutorSaturated
+from features import FEATURE_COLUMNS, CATEGORY_VOCAB, encode_features, build_feature_row
+from model_registry import ModelRegistry, ReloadInProgress
+from batcher import MicroBatcher
+from weather_snapshot import WeatherSnapshot
+from rate_limit import MemoryBucketBackend, RedisBucketBackend, RateLimiter, ConcurrencyLimit
+import metrics
+from recommendations import recommend_row, recommend_batch
 
 warnings.filterwarnings("ignore")
 
-app = FastAPI(title="Crop Prediction & Image Analysis API")
+
+# ==============================
+# Worker Pools
+# ==============================
+# OpenCV work runs here so it never blocks the event loop
+image_executor = BoundedExecutor(
+    "image-analysis",
+    max_workers=int(os.getenv("IMAGE_WORKERS", os.cpu_count() or 2)),
+    max_queue=int(os.getenv("IMAGE_QUEUE_SIZE", 32)),
+    kind=os.getenv("IMAGE_EXECUTOR", "thread"),
+)
+
+# bcrypt deliberately burns 100-300 ms of CPU per call; keep it off the event loop too
+password_executor = BoundedExecutor(
+    "password-hashing",
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", 2)),
+    max_queue=int(os.getenv("PASSWORD_HASH_QUEUE", 64)),
+)
+
+# /predict_yield/batch parsing, validation, scoring and rendering; a thread
+# pool because it reads the active model and module state
+batch_executor = BoundedExecutor(
+    "yield-batch",
+    max_workers=int(os.getenv("YIELD_BATCH_WORKERS", 2)),
+    max_queue=int(os.getenv("YIELD_BATCH_QUEUE", 8)),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled HTTP client for all outbound calls (keep-alive, bounded connections)
+    get_http_client()
+    if OPENWEATHER_KEY and WEATHER_SNAPSHOT_ENABLED:
+        weather_snapshot.start()
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        # Keep serving; /health/ready reports the database as unavailable
+        print("Could not ensure MongoDB indexes:", e)
+    image_executor.start()
+    password_executor.start()
+    batch_executor.start()
+    audit_log.start()
+    yield
+    await audit_log.stop(AUDIT_SHUTDOWN_TIMEOUT)
+    password_executor.shutdown()
+    batch_executor.shutdown()
+    image_executor.shutdown()
+    await weather_snapshot.stop()
+    await close_http_client()
+
+
+app = FastAPI(title="Crop Prediction & Image Analysis API", lifespan=lifespan)
 
 # ==============================
 # CORS Middleware
@@ -34,41 +104,160 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ==============================
+# Metrics
+# ==============================
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        metrics.REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            route=route.path if route is not None else "unmatched",
+            method=request.method,
+            status=status_code,
+            outcome=metrics.outcome_of(status_code),
+        )
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# ==============================
+# Health Checks
+# ==============================
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    try:
+        await check_database()
+    except Exception as e:
+        return JSONResponse(content={"status": "unavailable", "database": str(e)}, status_code=503)
+    return {"status": "ready", "database": "ok"}
+
 # ==============================
 # Load ML Model
 # ==============================
+# An explicit MODEL_PATH always wins. Otherwise prefer the binary UBJ export
+# (much faster to parse, see `python model_registry.py --help`), but only while
+# it is at least as new as the JSON, so a retrained JSON is never hidden
+# behind a stale conversion.
+MODEL_PATH_OVERRIDE = os.getenv("MODEL_PATH")
+MODEL_JSON_PATH = "crop_yield_model.json"
+MODEL_UBJ_PATH = "crop_yield_model.ubj"
+
+
+def resolve_model_path():
+    if MODEL_PATH_OVERRIDE:
+        return MODEL_PATH_OVERRIDE
+    try:
+        ubj_mtime = os.stat(MODEL_UBJ_PATH).st_mtime_ns
+    except OSError:
+        return MODEL_JSON_PATH
+    try:
+        json_mtime = os.stat(MODEL_JSON_PATH).st_mtime_ns
+    except OSError:
+        return MODEL_UBJ_PATH
+    return MODEL_UBJ_PATH if ubj_mtime >= json_mtime else MODEL_JSON_PATH
+
+
+MODEL_PATH = resolve_model_path()
+# Loaded versions kept in memory for rollback
+MODEL_KEEP_VERSIONS = int(os.getenv("MODEL_KEEP_VERSIONS", 3))
+# /model/reload and /model/rollback are disabled unless this is set
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN")
+
+
+def build_smoke_rows(count=4):
+    """A few representative rows every model must score before it goes live."""
+    rows = []
+    for i in range(count):
+        row = {col: list(codes)[i % len(codes)] for col, codes in CATEGORY_VOCAB.items()}
+        row.update(Year=2024, N=20.0 + 15 * i, P=10.0 + 8 * i, K=15.0 + 10 * i, pH=5.5 + 0.5 * i,
+                   Fertilizer_Amount=30.0 + 20 * i, Pesticide_Amount=2.0 + 2 * i, area=1.0)
+        rows.append(row)
+    return rows
+
+
+SMOKE_ROWS = build_smoke_rows()
+
+model_registry = ModelRegistry(
+    MODEL_PATH,
+    keep=MODEL_KEEP_VERSIONS,
+    smoke_batch=encode_features(pd.DataFrame(SMOKE_ROWS)),
+    min_features=len(FEATURE_COLUMNS),
+)
+
 try:
-    model = xgb.Booster()
-    model.load_model("crop_yield_model.json")
+    model_registry.load_and_activate()
     print("Model loaded successfully!")
 except FileNotFoundError:
-    print("Error: 'crop_yield_model.json' not found. Place it in the project folder.")
+    print(f"Error: '{MODEL_PATH}' not found. Place it in the project folder.")
     raise
 
+# "lean" writes the row straight into a float32 buffer and calls
+# inplace_predict; "pandas" goes through DataFrame -> DMatrix. Both must
+# score identically; tests/test_inference_parity.py checks that.
+YIELD_INFERENCE_PATH = os.getenv("YIELD_INFERENCE_PATH", "lean")
+
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+# Same header, but routes that also serve anonymous clients get None instead of a 401
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
 
 # ==============================
 # Auth Routes
 # ==============================
+async def run_password_job(fn, *args):
+    try:
+        return await password_executor.submit(fn, *args)
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry shortly",
+                            headers={"Retry-After": "1"})
+
+
 @app.post("/signup")
 async def signup(user: schemas.SignupModel):
-    existing_user = await users_collection.find_one({"email": user.email})
+    with metrics.stage("/signup", "mongo_lookup"):
+        existing_user = await users_collection.find_one({"email": user.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user.password)
+    with metrics.stage("/signup", "password_hash"):
+        hashed_password = await run_password_job(get_password_hash, user.password)
     user_dict = user.dict()
     user_dict["password"] = hashed_password
 
-    await users_collection.insert_one(user_dict)
+    try:
+        with metrics.stage("/signup", "mongo_insert"):
+            await users_collection.insert_one(user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
     return {"message": "User created successfully"}
 
 
 @app.post("/login")
 async def login(user: schemas.LoginModel):
-    db_user = await users_collection.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["password"]):
+    with metrics.stage("/login", "mongo_lookup"):
+        db_user = await users_collection.find_one({"email": user.email})
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    with metrics.stage("/login", "password_verify"):
+        password_ok = await run_password_job(verify_password, user.password, db_user["password"])
+    if not password_ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token_expires = timedelta(minutes=30)
@@ -78,16 +267,188 @@ async def login(user: schemas.LoginModel):
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+# Only what request handlers need; never load the password hash per request
+USER_PRINCIPAL_FIELDS = {"_id": 0, "email": 1, "username": 1}
+
+# Verified email -> user principal, so authenticated calls skip the Mongo round trip
+user_cache = AsyncTTLCache(
+    ttl=float(os.getenv("AUTH_USER_CACHE_TTL", 60)),
+    maxsize=int(os.getenv("AUTH_USER_CACHE_SIZE", 10000)),
+)
+
+
+def invalidate_cached_user(email: str = None):
+    """Drop one cached principal (e.g. after a profile change or deletion), or all of them."""
+    user_cache.invalidate(email)
+
+
+async def load_user_principal(email: str):
+    with metrics.stage("auth", "mongo_lookup"):
+        user = await users_collection.find_one({"email": email}, USER_PRINCIPAL_FIELDS)
+    if user is None:
+        # Raised (not returned) so unknown users are never cached
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     payload = verify_token(token)
     if payload is None:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
     email: str = payload.get("sub")
-    user = await users_collection.find_one({"email": email})
-    if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    # Copy so a handler can't modify the cached principal
+    return dict(await user_cache.get_or_fetch(email, lambda: load_user_principal(email)))
+
+
+@app.get("/auth/cache_stats")
+async def auth_cache_stats():
+    return user_cache.stats()
+
+# ==============================
+# Admission Control
+# ==============================
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# "memory" keeps buckets per process; "redis" shares them across processes
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+# How long a request may wait for a free slot on a busy route before a 429
+ROUTE_CONCURRENCY_WAIT = float(os.getenv("ROUTE_CONCURRENCY_WAIT", 0.05))
+# Comma-separated addresses/CIDRs of reverse proxies whose X-Forwarded-For is
+# believed; without it every client behind a proxy would share one bucket
+RATE_LIMIT_TRUSTED_PROXIES = [
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if entry.strip()
+]
+
+if RATE_LIMIT_BACKEND == "redis":
+    rate_limit_backend = RedisBucketBackend(RATE_LIMIT_REDIS_URL)
+else:
+    rate_limit_backend = MemoryBucketBackend(RATE_LIMIT_MAX_KEYS)
+
+predict_rate_limiter = RateLimiter(
+    "predict_yield", rate_limit_backend,
+    rate=float(os.getenv("PREDICT_RATE_PER_SECOND", 10)),
+    burst=int(os.getenv("PREDICT_RATE_BURST", 20)),
+)
+image_rate_limiter = RateLimiter(
+    "analyze_crop_image", rate_limit_backend,
+    rate=float(os.getenv("IMAGE_RATE_PER_SECOND", 2)),
+    burst=int(os.getenv("IMAGE_RATE_BURST", 5)),
+)
+# Batch routes are charged per row / per image, so their buckets are sized in those units
+batch_rows_rate_limiter = RateLimiter(
+    "predict_yield_batch_rows", rate_limit_backend,
+    rate=float(os.getenv("BATCH_ROWS_PER_SECOND", 1000)),
+    burst=int(os.getenv("BATCH_ROWS_BURST", os.getenv("MAX_BATCH_ROWS", 50000))),
+)
+batch_images_rate_limiter = RateLimiter(
+    "analyze_crop_images_batch", rate_limit_backend,
+    rate=float(os.getenv("BATCH_IMAGES_PER_SECOND", 5)),
+    burst=int(os.getenv("BATCH_IMAGES_BURST", os.getenv("MAX_BATCH_IMAGES", 1000))),
+)
+predict_concurrency = ConcurrencyLimit(int(os.getenv("PREDICT_MAX_CONCURRENCY", 64)), ROUTE_CONCURRENCY_WAIT)
+image_concurrency = ConcurrencyLimit(int(os.getenv("IMAGE_MAX_CONCURRENCY", 16)), ROUTE_CONCURRENCY_WAIT)
+field_map_concurrency = ConcurrencyLimit(int(os.getenv("FIELD_MAP_MAX_CONCURRENCY", 2)), ROUTE_CONCURRENCY_WAIT)
+batch_rows_concurrency = ConcurrencyLimit(int(os.getenv("BATCH_ROWS_MAX_CONCURRENCY", 4)), ROUTE_CONCURRENCY_WAIT)
+batch_images_concurrency = ConcurrencyLimit(int(os.getenv("BATCH_IMAGES_MAX_CONCURRENCY", 2)),
+                                            ROUTE_CONCURRENCY_WAIT)
+
+
+def is_trusted_proxy(address):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in RATE_LIMIT_TRUSTED_PROXIES)
+
+
+def client_address(request: Request):
+    """The peer address, or the first untrusted hop of X-Forwarded-For when the peer is a trusted proxy."""
+    host = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(host):
+        return host
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    # Proxies append, so read right to left and skip our own proxies
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else host
+
+
+async def rate_limit_key(request: Request, token: Optional[str]):
+    """The signed-in user when the request carries a valid token, else the client address."""
+    if token:
+        try:
+            user = await get_current_user(token)
+            return "user:" + user["email"]
+        except HTTPException:
+            pass
+    return "ip:" + client_address(request)
+
+
+def rate_limited(retry_after):
+    return HTTPException(status_code=429, detail="Rate limit exceeded",
+                         headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+def admission(limiter: RateLimiter, concurrency: ConcurrencyLimit):
+    """Dependency that rate-limits per client, then holds a route slot for the request.
+
+    Admission takes one token; batch routes call charge_units once they know
+    their size. The slot is held until the response (including a stream) is sent.
+    """
+    async def admit(request: Request, token: Optional[str] = Depends(optional_oauth2_scheme)):
+        if not RATE_LIMIT_ENABLED:
+            yield
+            return
+
+        key = await rate_limit_key(request, token)
+        allowed, retry_after = await limiter.take(key)
+        if not allowed:
+            raise rate_limited(retry_after)
+        if not await concurrency.acquire():
+            raise HTTPException(status_code=429, detail="Too many requests in progress, please retry shortly",
+                                headers={"Retry-After": "1"})
+        request.state.rate_limit = (limiter, key)
+        try:
+            yield
+        finally:
+            concurrency.release()
+    return admit
+
+
+async def charge_units(request: Request, units: int):
+    """Charge an admitted batch request for its size: units tokens in all, one already taken at admission."""
+    admitted = getattr(request.state, "rate_limit", None)
+    if admitted is None or units <= 1:
+        return
+    limiter, key = admitted
+    allowed, retry_after = await limiter.take(key, cost=units - 1)
+    if not allowed:
+        raise rate_limited(retry_after)
+
+
+@app.get("/rate_limit/stats")
+async def rate_limit_stats():
+    return {
+        "enabled": RATE_LIMIT_ENABLED,
+        "backend": rate_limit_backend.stats(),
+        "trusted_proxies": [str(network) for network in RATE_LIMIT_TRUSTED_PROXIES],
+        "routes": {
+            "/predict_yield": {**predict_rate_limiter.stats(), "concurrency": predict_concurrency.stats()},
+            "/predict_yield/batch": {**batch_rows_rate_limiter.stats(), "unit": "row",
+                                     "concurrency": batch_rows_concurrency.stats()},
+            "/analyze_crop_image": {**image_rate_limiter.stats(), "concurrency": image_concurrency.stats()},
+            "/analyze_crop_image/field_map": {**image_rate_limiter.stats(),
+                                              "concurrency": field_map_concurrency.stats()},
+            "/analyze_crop_images/batch": {**batch_images_rate_limiter.stats(), "unit": "image",
+                                           "concurrency": batch_images_concurrency.stats()},
+        },
+    }
 
 # ==============================
 # Weather Integration
@@ -103,30 +464,70 @@ STATE_TO_CITY = {
 }
 
 OPENWEATHER_KEY = os.getenv("OPENWEATHER_KEY")
+OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "https://api.openweathermap.org/data/2.5/weather")
+WEATHER_FALLBACK = {"Temp": 25, "Humidity": 60, "Rainfall": 500}
+
+# Weather changes slowly and there are only a few cities, so cache per city
+weather_cache = AsyncTTLCache(
+    ttl=float(os.getenv("WEATHER_CACHE_TTL", 600)),
+    maxsize=int(os.getenv("WEATHER_CACHE_SIZE", 256)),
+    stale_ttl=float(os.getenv("WEATHER_CACHE_STALE_TTL", 1800)),
+)
+
+
+async def fetch_weather_upstream(city: str):
+    params = {"q": city, "appid": OPENWEATHER_KEY, "units": "metric"}
+    resp = await get_http_client().get(OPENWEATHER_URL, params=params)
+    data = resp.json()
+
+    if data.get("cod") != 200:
+        raise ValueError(f"OpenWeather returned {data.get('cod')} for {city}")
+
+    temp = data["main"]["temp"]
+    humidity = data["main"]["humidity"]
+    rainfall = data.get("rain", {}).get("1h") or data.get("rain", {}).get("3h") or 0
+
+    return {"Temp": temp, "Humidity": humidity, "Rainfall": rainfall}
+
+
+# Cities in STATE_TO_CITY are refreshed in the background; requests read the
+# snapshot and only fetch on demand for cities it doesn't have (yet), or whose
+# entry is older than WEATHER_SNAPSHOT_MAX_AGE seconds (0 = no limit)
+WEATHER_SNAPSHOT_ENABLED = os.getenv("WEATHER_SNAPSHOT_ENABLED", "1") == "1"
+weather_snapshot = WeatherSnapshot(
+    STATE_TO_CITY.values(),
+    fetch_weather_upstream,
+    interval=float(os.getenv("WEATHER_REFRESH_INTERVAL", 600)),
+    concurrency=int(os.getenv("WEATHER_REFRESH_CONCURRENCY", 8)),
+    persist_path=os.getenv("WEATHER_SNAPSHOT_PATH") or None,
+    max_age=float(os.getenv("WEATHER_SNAPSHOT_MAX_AGE", 3600)),
+)
+
 
 async def fetch_weather(state: str):
     city = STATE_TO_CITY.get(state, state)
     if not OPENWEATHER_KEY:
-        return {"Temp": 25, "Humidity": 60, "Rainfall": 500}  # fallback
+        return dict(WEATHER_FALLBACK)
+
+    weather = weather_snapshot.get(city)
+    if weather is not None:
+        return weather
 
-    url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={OPENWEATHER_KEY}&units=metric"
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url, timeout=10)
-            data = resp.json()
+        return await weather_cache.get_or_fetch(city, lambda: fetch_weather_upstream(city))
+    except Exception as e:
+        print("Weather fetch failed:", e)
+        return dict(WEATHER_FALLBACK)
 
-        if data.get("cod") != 200:
-            return {"Temp": 25, "Humidity": 60, "Rainfall": 500}
 
-        temp = data["main"]["temp"]
-        humidity = data["main"]["humidity"]
-        rainfall = data.get("rain", {}).get("1h") or data.get("rain", {}).get("3h") or 0
+@app.get("/weather/cache_stats")
+async def weather_cache_stats():
+    return weather_cache.stats()
 
-        return {"Temp": temp, "Humidity": humidity, "Rainfall": rainfall}
 
-    except Exception as e:
-        print("Weather fetch failed:", e)
-        return {"Temp": 25, "Humidity": 60, "Rainfall": 500}
+@app.get("/weather/snapshot")
+async def weather_snapshot_stats():
+    return weather_snapshot.stats()
 
 # ==============================
 # Yield Prediction
@@ -146,395 +547,687 @@ class YieldInput(BaseModel):
     sowing_date: str
     area: float
 
-@app.post("/predict_yield")
+
+# Max rows accepted by /predict_yield/batch in one request
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", 50000))
+# CSV/Parquet uploads to /predict_yield/batch larger than this are rejected with 413
+MAX_BATCH_FILE_BYTES = int(os.getenv("MAX_BATCH_FILE_BYTES", 64 * 1024 * 1024))
+
+
+def generate_recommendations(input_data, weather_data, predicted_yield):
+    return recommend_row({**input_data, **weather_data, "predicted_yield": predicted_yield})
+
+
+def build_yield_result(input_data, weather_data, predicted_yield, recommendations=None):
+    if recommendations is None:
+        recommendations = generate_recommendations(input_data, weather_data, predicted_yield)
+    total_production_kg = predicted_yield * input_data["area"]
+    total_production_tonnes = total_production_kg / 1000
+
+    return {
+        "crop_name": input_data["Crop"],
+        "location": input_data["State"],
+        "area": input_data["area"],
+        "weather": {
+            "temperature": weather_data["Temp"],
+            "humidity": weather_data["Humidity"],
+            "description": "Data from API"},
+        "predicted_yield_kgha": predicted_yield,
+        "total_production_tonnes": total_production_tonnes,
+        "recommendations": recommendations,
+        "sowing_date": input_data["sowing_date"]
+    }
+
+
+# ==============================
+# Prediction Cache
+# ==============================
+# Repeated inputs (same cooperative template) skip the booster entirely
+PREDICTION_CACHE_ENABLED = os.getenv("PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+prediction_cache = LRUCache(maxsize=int(os.getenv("PREDICTION_CACHE_SIZE", 50000)))
+
+# How often (seconds) to stat the model file to notice it was replaced
+MODEL_FILE_CHECK_INTERVAL = float(os.getenv("MODEL_FILE_CHECK_INTERVAL", 5))
+_model_file_checked_at = time.monotonic()
+_background_tasks = set()
+
+
+def on_model_activated(loaded_model):
+    # Keys carry the model version, so this only frees memory early. Called
+    # on the event loop thread (or at startup), since the LRUCache isn't thread-safe.
+    prediction_cache.clear()
+
+
+model_registry.on_activate = on_model_activated
+
+
+async def reload_model_in_background():
+    try:
+        await model_registry.reload()
+    except Exception as e:
+        print("Model reload failed, keeping the current model:", e)
+
+
+def reload_model_if_file_changed():
+    global _model_file_checked_at
+    now = time.monotonic()
+    if now - _model_file_checked_at < MODEL_FILE_CHECK_INTERVAL:
+        return
+    _model_file_checked_at = now
+    # Follow the file that should be served now (e.g. a JSON newer than the UBJ)
+    model_registry.path = resolve_model_path()
+    if model_registry.file_changed():
+        task = asyncio.ensure_future(reload_model_in_background())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+def weather_bucket(weather_data):
+    # Coarse buckets: 1 °C, 5 % humidity, 10 mm rain
+    return (round(weather_data["Temp"]), int(weather_data["Humidity"] // 5),
+            int(weather_data["Rainfall"] // 10))
+
+
+# ==============================
+# Micro-batching
+# ==============================
+# Opt-in: concurrent /predict_yield calls arriving within the window share one predict call
+YIELD_MICROBATCH_ENABLED = os.getenv("YIELD_MICROBATCH_ENABLED", "false").lower() == "true"
+
+
+def predict_matrix(matrix, loaded_model):
+    # Rows are grouped by the model they were encoded (and cache-keyed) for,
+    # so a reload mid-window doesn't score them with a different booster
+    return [float(p) for p in loaded_model.booster.inplace_predict(matrix)]
+
+
+yield_batcher = MicroBatcher(
+    predict_matrix,
+    window_ms=float(os.getenv("YIELD_MICROBATCH_WINDOW_MS", 2)),
+    max_batch_size=int(os.getenv("YIELD_MICROBATCH_MAX_SIZE", 64)),
+)
+
+
+@app.get("/predict_yield/batcher_stats")
+async def yield_batcher_stats():
+    return {"enabled": YIELD_MICROBATCH_ENABLED, **yield_batcher.stats()}
+
+
+async def predict_single(input_data, weather_data):
+    """Return (predicted_yield, model_version) for one YieldInput dict."""
+    reload_model_if_file_changed()
+    current = model_registry.active
+    with metrics.stage("/predict_yield", "feature_encoding"):
+        row = build_feature_row(input_data, current.num_features)
+
+    cache_key = None
+    if PREDICTION_CACHE_ENABLED:
+        cache_key = (current.version, row.tobytes(), weather_bucket(weather_data))
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached, current.version
+
+    if YIELD_MICROBATCH_ENABLED:
+        # submit() copies the row, so the shared buffer can be reused meanwhile
+        with metrics.stage("/predict_yield", "model_predict_batched"):
+            predicted_yield = await yield_batcher.submit(row, current)
+    elif YIELD_INFERENCE_PATH == "lean":
+        with metrics.stage("/predict_yield", "model_predict"):
+            predicted_yield = float(current.booster.inplace_predict(row)[0])
+    else:
+        with metrics.stage("/predict_yield", "feature_encoding_pandas"):
+            df_input = encode_features(pd.DataFrame([input_data]))
+        with metrics.stage("/predict_yield", "dmatrix_build"):
+            dmatrix = xgb.DMatrix(df_input)
+        with metrics.stage("/predict_yield", "model_predict"):
+            predicted_yield = float(current.booster.predict(dmatrix)[0])
+
+    if cache_key is not None:
+        prediction_cache.put(cache_key, predicted_yield)
+    return predicted_yield, current.version
+
+
+@app.get("/predict_yield/cache_stats")
+async def prediction_cache_stats():
+    return {"model_version": model_registry.active.version, **prediction_cache.stats()}
+
+
+# ==============================
+# Model Management
+# ==============================
+def require_model_admin(x_admin_token: Optional[str] = Header(None)):
+    if not MODEL_ADMIN_TOKEN or not hmac.compare_digest(x_admin_token or "", MODEL_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Model administration is not allowed")
+
+
+class ModelReloadRequest(BaseModel):
+    path: Optional[str] = None
+
+
+@app.get("/model/versions")
+async def model_versions():
+    return model_registry.versions()
+
+
+@app.post("/model/reload", dependencies=[Depends(require_model_admin)])
+async def reload_model_api(body: Optional[ModelReloadRequest] = None):
+    try:
+        loaded = await model_registry.reload(body.path if body else None)
+    except ReloadInProgress as e:
+        return JSONResponse(content={"error": str(e)}, status_code=409)
+    except Exception as e:
+        return JSONResponse(content={"error": f"Model reload failed: {e}"}, status_code=400)
+    return {"message": "Model reloaded", **loaded.info()}
+
+
+@app.post("/model/rollback", dependencies=[Depends(require_model_admin)])
+async def rollback_model_api(version: Optional[str] = None):
+    try:
+        loaded = model_registry.rollback(version)
+    except LookupError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=404)
+    return {"message": "Model rolled back", **loaded.info()}
+
+
+def audit_record(route, inputs, result):
+    """Document stored by the write-behind audit log for one served result."""
+    return {
+        "route": route,
+        "created_at": datetime.now(timezone.utc),
+        "input": inputs,
+        "result": result,
+    }
+
+
+@app.post("/predict_yield", dependencies=[Depends(admission(predict_rate_limiter, predict_concurrency))])
 async def predict_yield_api(data: YieldInput):
     input_data = data.dict()
 
     try:
         # Fetch live weather
-        weather_data = await fetch_weather(input_data["State"])
-        Temp = weather_data["Temp"]
-        Humidity = weather_data["Humidity"]
-        Rainfall = weather_data["Rainfall"]
-
-        df_input = pd.DataFrame([input_data])
-
-        categorical_cols = ['Crop', 'State', 'soil_type', 'Fertilizer_Type']
-        for col in categorical_cols:
-            df_input[col] = df_input[col].astype('category').cat.codes
-
-        if 'sowing_date' in df_input.columns:
-            df_input = df_input.drop(columns=['sowing_date'])
-
-        dmatrix = xgb.DMatrix(df_input)
-        predicted_yield = float(model.predict(dmatrix)[0])
-
-        total_production_kg = predicted_yield * input_data["area"]
-        total_production_tonnes = total_production_kg / 1000
-
-        recommendations = []
-
-        # ==============================
-        # Nutrient Recommendations
-        # ==============================
-        if input_data["N"] < 30:
-            msgs = [
-                "🌱 Nitrogen very low: Apply 25–30 kg/ha urea immediately.",
-                "🌱 Severe nitrogen deficiency detected — add 25–30 kg/ha urea soon.",
-                "🌱 Nitrogen levels are critically low, urgent urea application recommended."
-            ]
-            recommendations.append(random.choice(msgs))
-        elif input_data["N"] < 50:
-            msgs = [
-                "🌱 Nitrogen low: Apply nitrogen-rich fertilizer like urea.",
-                "🌱 Mild nitrogen shortage. Consider using urea or ammonium sulfate.",
-                "🌱 Nitrogen is slightly low — boost with nitrogen fertilizer."
-            ]
-            recommendations.append(random.choice(msgs))
-        else:
-            msgs = [
-                "🌱 Nitrogen levels are sufficient.",
-                "🌱 Adequate nitrogen detected, no immediate action needed.",
-                "🌱 Nitrogen supply is optimal — maintain current fertilization."
-            ]
-            recommendations.append(random.choice(msgs))
-
-        if input_data["P"] < 15:
-            msgs = [
-                "🌿 Phosphorus very low: Apply 30–40 kg/ha DAP.",
-                "🌿 Severe phosphorus deficiency — provide DAP urgently.",
-                "🌿 Very low phosphorus detected. Apply 30–40 kg/ha phosphate fertilizer."
-            ]
-            recommendations.append(random.choice(msgs))
-        elif input_data["P"] < 25:
-            msgs = [
-                "🌿 Phosphorus low: Consider additional phosphorus fertilizer.",
-                "🌿 Mild phosphorus shortage observed. Top-up with phosphate fertilizer.",
-                "🌿 Phosphorus slightly low — apply more DAP for balance."
-            ]
-            recommendations.append(random.choice(msgs))
-        else:
-            msgs = [
-                "🌿 Phosphorus levels are sufficient.",
-                "🌿 Adequate phosphorus detected, no action needed.",
-                "🌿 Phosphorus levels are balanced — maintain current fertilization."
-            ]
-            recommendations.append(random.choice(msgs))
-
-        if input_data["K"] < 20:
-            msgs = [
-                "🪴 Potassium very low: Apply 30–40 kg/ha MOP.",
-                "🪴 Severe potassium deficiency detected, add muriate of potash.",
-                "🪴 Very low potassium levels, apply MOP urgently."
-            ]
-            recommendations.append(random.choice(msgs))
-        elif input_data["K"] < 35:
-            msgs = [
-                "🪴 Potassium low: Consider additional potassium fertilizer.",
-                "🪴 Mild potassium shortage — add muriate of potash (MOP).",
-                "🪴 Potassium is slightly low, top-up recommended."
-            ]
-            recommendations.append(random.choice(msgs))
-        else:
-            msgs = [
-                "🪴 Potassium levels are sufficient.",
-                "🪴 Adequate potassium detected.",
-                "🪴 Potassium status is optimal — no adjustments required."
-            ]
-            recommendations.append(random.choice(msgs))
-
-        # pH
-        if input_data["pH"] < 6.0:
-            msgs = [
-                "🧪 Soil is acidic. Apply lime to raise pH and improve nutrient uptake.",
-                "🧪 The soil shows acidity — consider liming to balance pH.",
-                "🧪 Acidic soil detected. Add lime to improve nutrient absorption."
-            ]
-            recommendations.append(random.choice(msgs))
-        elif input_data["pH"] > 7.5:
-            msgs = [
-                "🧪 Soil is alkaline. Add organic matter or gypsum to improve pH.",
-                "🧪 High alkalinity detected — gypsum application recommended.",
-                "🧪 Alkaline soil present. Use organic matter to rebalance pH."
-            ]
-            recommendations.append(random.choice(msgs))
-        else:
-            msgs = [
-                "🧪 Soil pH is optimal.",
-                "🧪 Balanced soil pH detected.",
-                "🧪 Soil pH is within the healthy range."
-            ]
-            recommendations.append(random.choice(msgs))
-
-        # Weather-based recommendations
-        if Rainfall < 200:
-            msgs = [
-                "💧 Low rainfall detected. Irrigation is necessary.",
-                "💧 Very little rainfall — ensure supplementary irrigation.",
-                "💧 Insufficient rainfall, arrange irrigation support."
-            ]
-            recommendations.append(random.choice(msgs))
-        elif Rainfall > 800:
-            msgs = [
-                "💧 High rainfall. Ensure proper drainage to avoid waterlogging.",
-                "💧 Excess rainfall observed — maintain good field drainage.",
-                "💧 Heavy rainfall detected, check for waterlogging issues."
-            ]
-            recommendations.append(random.choice(msgs))
-        else:
-            msgs = [
-                "💧 Rainfall is adequate.",
-                "💧 Rainfall levels are optimal for crop growth.",
-                "💧 Adequate rainfall — irrigation adjustments not needed."
-            ]
-            recommendations.append(random.choice(msgs))
-
-        if Temp > 35:
-            msgs = [
-                "☀️ High temperature: Use mulching/shading or plant heat-tolerant varieties.",
-                "☀️ Extreme heat detected — provide shade or mulch for crops.",
-                "☀️ High temperatures can stress crops, consider heat-tolerant seeds."
-            ]
-            recommendations.append(random.choice(msgs))
-        elif Temp < 15:
-            msgs = [
-                "❄️ Low temperature: Protect crops from frost if applicable.",
-                "❄️ Very cold conditions detected — cover young plants if possible.",
-                "❄️ Low temperatures may harm crops — take protective measures."
-            ]
-            recommendations.append(random.choice(msgs))
-        else:
-            msgs = [
-                "🌡️ Temperature is within optimal range.",
-                "🌡️ Temperature levels are suitable for growth.",
-                "🌡️ Current temperature is favorable for crops."
-            ]
-            recommendations.append(random.choice(msgs))
-
-        if Humidity > 80:
-            msgs = [
-                "💦 High humidity: Monitor for fungal diseases and apply fungicides proactively.",
-                "💦 Excess humidity may trigger fungal infections — take preventive steps.",
-                "💦 Very humid conditions detected, keep watch for fungal outbreaks."
-            ]
-            recommendations.append(random.choice(msgs))
-        elif Humidity < 50:
-            msgs = [
-                "💦 Low humidity: Use drip irrigation or maintain soil moisture.",
-                "💦 Dry air detected — ensure consistent soil watering.",
-                "💦 Low humidity may dry crops, maintain irrigation."
-            ]
-            recommendations.append(random.choice(msgs))
-        else:
-            msgs = [
-                "💦 Humidity is within ideal range.",
-                "💦 Balanced humidity observed.",
-                "💦 Humidity levels are favorable for crops."
-            ]
-            recommendations.append(random.choice(msgs))
-
-        # Fertilizer & Pesticide
-        if input_data["Fertilizer_Amount"] < 50:
-            msgs = [
-                f"🌾 Fertilizer amount is low. Consider increasing {input_data['Fertilizer_Type']} fertilizer for optimal growth.",
-                f"🌾 Low fertilizer detected — add more {input_data['Fertilizer_Type']} for better yield.",
-                f"🌾 Insufficient fertilizer applied. Increase {input_data['Fertilizer_Type']} usage."
-            ]
-            recommendations.append(random.choice(msgs))
-        if input_data["Pesticide_Amount"] < 5:
-            msgs = [
-                "🐛 Pesticide amount is low. Regular pest monitoring is recommended.",
-                "🐛 Low pesticide use detected — ensure proper pest surveillance.",
-                "🐛 Insufficient pesticide applied. Monitor crops closely."
-            ]
-            recommendations.append(random.choice(msgs))
-
-        # Crop health status
-        if predicted_yield > 80:
-            crop_status = "Excellent"
-            msgs = [
-                "📊 Overall crop health is excellent. Maintain current practices.",
-                "📊 Crops look excellent — continue with existing care.",
-                "📊 Excellent yield potential — sustain present management."
-            ]
-            recommendations.append(random.choice(msgs))
-        elif predicted_yield > 50:
-            crop_status = "Moderate"
-            msgs = [
-                "📊 Overall crop health is moderate. Follow above recommendations for better yield.",
-                "📊 Crop condition is moderate — improvements possible with adjustments.",
-                "📊 Yield outlook is moderate. Apply suggested measures for improvement."
-            ]
-            recommendations.append(random.choice(msgs))
-        else:
-            crop_status = "Poor"
-            msgs = [
-                "📊 Overall crop health is poor. Immediate action required: optimize nutrients, irrigation, and pest control.",
-                "📊 Crop condition is poor — urgent corrective action needed.",
-                "📊 Very low crop health detected. Adjust fertilization, water, and pest management immediately."
-            ]
-            recommendations.append(random.choice(msgs))
-
-        result = {
-            "crop_name": input_data["Crop"],
-            "location": input_data["State"],
-            "area": input_data["area"],
-            "weather": {
-                "temperature": Temp,
-                "humidity": Humidity,
-                "description": "Data from API"},
-            "predicted_yield_kgha": predicted_yield,
-            "total_production_tonnes": total_production_tonnes,
-            "recommendations": recommendations,
-            "sowing_date": input_data["sowing_date"]
-        }
-
-        return JSONResponse(content=result)
+        with metrics.stage("/predict_yield", "weather_fetch"):
+            weather_data = await fetch_weather(input_data["State"])
+
+        predicted_yield, model_version = await predict_single(input_data, weather_data)
+
+        with metrics.stage("/predict_yield", "recommendations"):
+            result = build_yield_result(input_data, weather_data, predicted_yield)
+        result["model_version"] = model_version
+        response = JSONResponse(content=result)
+        await audit_log.record(audit_record("/predict_yield", input_data, result))
+        return response
 
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=400)
 
 
-
 # ==============================
-# Image Analysis
+# Batch Yield Prediction
 # ==============================
-import random
+async def read_batch_payload(request: Request):
+    """Read the raw batch body: (raw bytes, filename) for uploads, (raw bytes, None) for JSON.
+
+    Only the bytes are read here, with a size cap; parsing happens off the event loop.
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise ValueError("Expected a CSV or Parquet upload in the 'file' field")
+        return await read_upload_limited(upload, MAX_BATCH_FILE_BYTES), (upload.filename or "").lower()
+
+    chunks = []
+    total = 0
+    async for chunk in request.stream():
+        total += len(chunk)
+        if total > MAX_BATCH_FILE_BYTES:
+            raise UploadTooLarge(f"Upload exceeds {MAX_BATCH_FILE_BYTES} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks), None
+
+
+def parse_batch_records(raw, filename):
+    """Accept either a JSON list of YieldInput records or a CSV/Parquet upload."""
+    if filename is not None:
+        if filename.endswith((".parquet", ".pq")):
+            df = pd.read_parquet(io.BytesIO(raw))
+        else:
+            df = pd.read_csv(io.BytesIO(raw))
+        # NaN -> None so missing cells surface as validation errors per row
+        df = df.astype(object).where(df.notna(), None)
+        return df.to_dict(orient="records")
+
+    payload = json.loads(raw)
+    if isinstance(payload, dict):
+        payload = payload.get("records")
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON list of records")
+    return payload
+
+
+def validate_batch(raw, filename):
+    """Parse and validate a batch; returns (results with per-row errors filled in, valid rows)."""
+    records = parse_batch_records(raw, filename)
+    if len(records) > MAX_BATCH_ROWS:
+        raise UploadTooLarge(f"Batch too large: {len(records)} rows (max {MAX_BATCH_ROWS})")
+
+    results = [None] * len(records)
+    valid_rows = []
+    for i, record in enumerate(records):
+        try:
+            valid_rows.append((i, YieldInput(**record).dict()))
+        except (ValidationError, TypeError) as e:
+            results[i] = {"index": i, "error": str(e)}
+    return results, valid_rows
+
+
+def score_batch(results, valid_rows, weather_by_state):
+    """Predict and recommend for the valid rows in one pass.
+
+    Returns (rendered response, audit documents for the rows that succeeded).
+    """
+    current = model_registry.active
+    audit_documents = []
+    if valid_rows:
+        try:
+            df_rows = pd.DataFrame([row for _, row in valid_rows])
+            predictions = current.booster.predict(xgb.DMatrix(encode_features(df_rows)))
+
+            # Recommendations for the whole batch in one vectorized pass
+            for field in ("Temp", "Humidity", "Rainfall"):
+                df_rows[field] = df_rows["State"].map(lambda s: weather_by_state[s][field])
+            df_rows["predicted_yield"] = predictions
+            batch_recommendations = recommend_batch(df_rows)
+        except Exception as e:
+            return JSONResponse(content={"error": str(e)}, status_code=400), []
+
+        for (i, row), predicted_yield, recommendations in zip(valid_rows, predictions, batch_recommendations):
+            try:
+                result = build_yield_result(row, weather_by_state[row["State"]], float(predicted_yield),
+                                            recommendations)
+                results[i] = {"index": i, **result}
+            except Exception as e:
+                results[i] = {"index": i, "error": str(e)}
+                continue
+            if audit_log.enabled:
+                audit_documents.append(audit_record("/predict_yield/batch", row, result))
+
+    failed = sum(1 for r in results if "error" in r)
+    # Rendering tens of thousands of rows is CPU work too, so it happens here
+    return JSONResponse(content={
+        "model_version": current.version,
+        "count": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    }), audit_documents
+
+
+@app.post("/predict_yield/batch",
+          dependencies=[Depends(admission(batch_rows_rate_limiter, batch_rows_concurrency))])
+async def predict_yield_batch_api(request: Request):
+    try:
+        raw, filename = await read_batch_payload(request)
+        results, valid_rows = await batch_executor.submit(validate_batch, raw, filename)
+    except UploadTooLarge as e:
+        return JSONResponse(content={"error": str(e)}, status_code=413)
+    except ExecutorSaturated:
+        return JSONResponse(content={"error": "Batch scoring is busy, please retry shortly"},
+                            status_code=503, headers={"Retry-After": "1"})
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    await charge_units(request, len(results))
+
+    # One weather lookup per distinct known state, fetched concurrently. Only
+    # STATE_TO_CITY states are looked up, so a batch of made-up states can't
+    # fan out into thousands of upstream calls; the rest use the fallback.
+    states = {row["State"] for _, row in valid_rows}
+    known = sorted(states & STATE_TO_CITY.keys())
+    weather_by_state = {state: dict(WEATHER_FALLBACK) for state in states}
+    weather_by_state.update(zip(known, await asyncio.gather(*(fetch_weather(s) for s in known))))
+
+    try:
+        response, audit_documents = await batch_executor.submit(score_batch, results, valid_rows, weather_by_state)
+    except ExecutorSaturated:
+        return JSONResponse(content={"error": "Batch scoring is busy, please retry shortly"},
+                            status_code=503, headers={"Retry-After": "1"})
+    # One audit record per scored row, as if each had been sent to /predict_yield
+    for document in audit_documents:
+        await audit_log.record(document)
+    return response
+
 
 # ==============================
-# Image Analysis (Multiple Statements)
+# Image Analysis
 # ==============================
-def analyze_crop_health_detailed(image_path, crop_type="Wheat"):
-    img = cv2.imread(image_path)
-    if img is None:
-        return {"error": "Image not found!"}
+def load_image_analysis():
+    """Import the OpenCV pipeline on first use, keeping cv2 out of server start-up."""
+    import image_analysis
+    return image_analysis
 
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    img_resized = cv2.resize(img_rgb, (256, 256))
-    hsv = cv2.cvtColor(img_resized, cv2.COLOR_RGB2HSV)
 
-    total_pixels = img_resized.shape[0] * img_resized.shape[1]
+# Uploads larger than this are rejected with 413
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", 20 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
-    green_mask = cv2.inRange(hsv, (25, 40, 40), (95, 255, 255))
-    green_count = np.sum(green_mask > 0)
 
-    yellow_mask = cv2.inRange(hsv, (20, 100, 100), (40, 255, 255))
-    yellow_count = np.sum(yellow_mask > 0)
+class UploadTooLarge(Exception):
+    pass
 
-    brown_mask = cv2.inRange(hsv, (10, 50, 20), (20, 255, 100))
-    brown_count = np.sum(brown_mask > 0)
 
-    gray_mask = cv2.inRange(hsv, (0, 0, 40), (180, 50, 180))
-    gray_count = np.sum(gray_mask > 0)
+async def read_upload_limited(file: UploadFile, max_bytes: int = MAX_IMAGE_BYTES):
+    """Read an upload in chunks, giving up as soon as it exceeds max_bytes."""
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
 
-    # Ratios
-    green_ratio = green_count / total_pixels
-    yellow_ratio = yellow_count / total_pixels
-    brown_ratio = brown_count / total_pixels
-    gray_ratio = gray_count / total_pixels
+    chunks = []
+    total = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
 
-    health_score = green_ratio * 100  
-
-    analysis = {
-        "crop_type": crop_type,
-        "health_score_percent": round(health_score, 2),
-        "leaf_conditions": {
-            "healthy_green_percent": round(green_ratio * 100, 2),
-            "yellow_leaves_percent": round(yellow_ratio * 100, 2),
-            "brown_spots_percent": round(brown_ratio * 100, 2),
-            "dry_gray_percent": round(gray_ratio * 100, 2)
-        },
-        "diagnosis": [],
-        "recommendations": []
-    }
 
-    # --- Nitrogen deficiency (yellow) ---
-    if yellow_ratio > 0.05:
-        nitrogen_diag = [
-            "Nitrogen deficiency detected (yellow leaves).",
-            "Leaves show yellowing, likely from low nitrogen.",
-            "Crop may be suffering from nitrogen stress.",
-            "Yellowing leaves suggest nitrogen shortage.",
-            "Signs of poor nitrogen nutrition are visible."
-        ]
-        nitrogen_reco = [
-            "Apply nitrogen-rich fertilizer immediately (e.g., urea).",
-            "Use ammonium nitrate or urea to restore nitrogen levels.",
-            "Boost nitrogen with compost or organic fertilizer.",
-            "Add nitrogenous fertilizer to improve leaf greenness.",
-            "Supply additional nitrogen to avoid stunted growth."
-        ]
-        analysis["diagnosis"] += random.sample(nitrogen_diag, k=3)
-        analysis["recommendations"] += random.sample(nitrogen_reco, k=3)
-
-    # --- Disease / pest (brown) ---
-    if brown_ratio > 0.02:
-        disease_diag = [
-            "Possible disease or pest attack (brown spots).",
-            "Brown lesions may indicate fungal infection.",
-            "Pest or disease stress detected on leaves.",
-            "Spotted leaves suggest pathogen activity.",
-            "Crop may be affected by pests or early blight."
-        ]
-        disease_reco = [
-            "Apply suitable fungicide/pesticide for this crop.",
-            "Spray approved fungicides and monitor regularly.",
-            "Seek agri-expert advice for targeted pest control.",
-            "Follow integrated pest management practices.",
-            "Rotate crops to reduce pest and disease pressure."
-        ]
-        analysis["diagnosis"] += random.sample(disease_diag, k=3)
-        analysis["recommendations"] += random.sample(disease_reco, k=3)
-
-    # --- Dry/gray patches ---
-    if gray_ratio > 0.05:
-        gray_diag = [
-            "Signs of drought stress observed.",
-            "Gray patches may indicate dry leaves.",
-            "Possible water shortage symptoms on crop.",
-            "Leaves appear dehydrated or moisture-stressed.",
-            "Soil moisture stress signs detected in foliage."
-        ]
-        gray_reco = [
-            "Increase irrigation and check soil moisture.",
-            "Apply mulching to retain soil water.",
-            "Follow a regular watering schedule.",
-            "Ensure irrigation matches crop growth stage.",
-            "Improve soil moisture retention with organic matter."
-        ]
-        analysis["diagnosis"] += random.sample(gray_diag, k=3)
-        analysis["recommendations"] += random.sample(gray_reco, k=3)
-
-    # --- Healthy crop ---
-    if green_ratio > 0.8 and yellow_ratio < 0.05 and brown_ratio < 0.02 and gray_ratio < 0.05:
-        healthy_diag = [
-            "Crop looks healthy and vigorous.",
-            "Foliage is lush and green.",
-            "Plant canopy appears stress-free.",
-            "Crop is in excellent health condition.",
-            "Overall crop health is good with no major stress."
-        ]
-        healthy_reco = [
-            "Maintain regular irrigation schedule.",
-            "Continue current crop management practices.",
-            "No major action needed, keep monitoring.",
-            "Sustain present practices for stable growth.",
-            "Keep observing for early signs of stress."
-        ]
-        analysis["diagnosis"] += random.sample(healthy_diag, k=3)
-        analysis["recommendations"] += random.sample(healthy_reco, k=3)
-
-    return analysis
-
-
-@app.post("/analyze_crop_image")
+@app.post("/analyze_crop_image", dependencies=[Depends(admission(image_rate_limiter, image_concurrency))])
 async def analyze_crop_image_api(file: UploadFile = File(...), crop_type: str = "Wheat"):
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            tmp.write(await file.read())
-            tmp_path = tmp.name
+        with metrics.stage("/analyze_crop_image", "read"):
+            data = await read_upload_limited(file)
+        result, timings = await image_executor.submit(
+            load_image_analysis().analyze_crop_health_timed, data, crop_type)
+        metrics.record_stages("/analyze_crop_image", timings)
+        with metrics.stage("/analyze_crop_image", "serialization"):
+            response = JSONResponse(content={"result": result})
+        await audit_log.record(audit_record(
+            "/analyze_crop_image",
+            {"crop_type": crop_type, "filename": file.filename, "bytes": len(data)},
+            result,
+        ))
+        return response
+    except UploadTooLarge as e:
+        return JSONResponse(content={"error": str(e)}, status_code=413)
+    except ExecutorSaturated:
+        return JSONResponse(
+            content={"error": "Image analysis is busy, please retry shortly"},
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
+
+@app.get("/audit/stats")
+async def audit_log_stats():
+    return audit_log.stats()
+
+
+@app.get("/analyze_crop_image/stats")
+async def image_analysis_stats():
+    return image_executor.stats()
 
-        result = analyze_crop_health_detailed(tmp_path, crop_type)
+
+# ==============================
+# Field Map (tiled analysis)
+# ==============================
+# Orthomosaics are spooled to disk, not memory, so the limit can be larger than
+# MAX_IMAGE_BYTES; it still bounds temp space and tile work per request
+MAX_FIELD_IMAGE_BYTES = int(os.getenv("MAX_FIELD_IMAGE_BYTES", 512 * 1024 * 1024))
+MIN_FIELD_TILE_SIZE = 64
+MAX_FIELD_TILE_SIZE = 4096
+
+
+async def spool_upload(file: UploadFile, max_bytes: int):
+    """Copy an upload to a named temp file in chunks and return its path."""
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+
+    # Keep the extension: .npy uploads are recognised by name
+    suffix = os.path.splitext(file.filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(prefix="field_", suffix=suffix)
+    total = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                # Disk writes can stall (page cache flushes), so keep them off the loop
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+@app.post("/analyze_crop_image/field_map",
+          dependencies=[Depends(admission(image_rate_limiter, field_map_concurrency))])
+async def analyze_field_map_api(file: UploadFile = File(...), crop_type: str = "Wheat",
+                                tile_size: Optional[int] = None):
+    """Per-tile health grid for a large field image (uncompressed TIFF/BMP are memory-mapped)."""
+    if tile_size is not None and not MIN_FIELD_TILE_SIZE <= tile_size <= MAX_FIELD_TILE_SIZE:
+        return JSONResponse(
+            content={"error": f"tile_size must be between {MIN_FIELD_TILE_SIZE} and {MAX_FIELD_TILE_SIZE}"},
+            status_code=400,
+        )
+    path = None
+    try:
+        with metrics.stage("/analyze_crop_image/field_map", "read"):
+            path = await spool_upload(file, MAX_FIELD_IMAGE_BYTES)
+        with metrics.stage("/analyze_crop_image/field_map", "tiles"):
+            result = await image_executor.submit(
+                load_image_analysis().analyze_field_tiles, path, crop_type, tile_size)
         return JSONResponse(content={"result": result})
+    except UploadTooLarge as e:
+        return JSONResponse(content={"error": str(e)}, status_code=413)
+    except ExecutorSaturated:
+        return JSONResponse(
+            content={"error": "Image analysis is busy, please retry shortly"},
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    finally:
+        if path is not None:
+            os.unlink(path)
+
+
+# ==============================
+# Batch Image Analysis
+# ==============================
+MAX_BATCH_IMAGES = int(os.getenv("MAX_BATCH_IMAGES", 1000))
+# Batch uploads are spooled to disk, so this bounds temp space rather than memory
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", 1024 * 1024 * 1024))
+# How long a batch image may wait for a free worker before it is reported as failed
+BATCH_IMAGE_WAIT_SECONDS = float(os.getenv("BATCH_IMAGE_WAIT_SECONDS", 60))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def is_zip_upload(file: UploadFile):
+    return (file.filename or "").lower().endswith(".zip") or file.content_type in (
+        "application/zip", "application/x-zip-compressed")
+
+
+def list_zip_images(path):
+    """Names of the image members of a zip on disk (reads only the central directory)."""
+    with zipfile.ZipFile(path) as archive:
+        names = []
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if info.file_size > MAX_IMAGE_BYTES:
+                raise UploadTooLarge(f"{info.filename} exceeds {MAX_IMAGE_BYTES} bytes")
+            names.append(info.filename)
+        return names
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+async def collect_batch_images(files: List[UploadFile]):
+    """Spool uploads to temp files and list the images in them, without decoding anything.
+
+    Returns (temp paths, [(filename, path, zip member or None)]). Each image is
+    read from disk by the worker that analyses it, so request memory doesn't
+    grow with the batch size.
+    """
+    paths = []
+    images = []
+    total = 0
+    try:
+        for file in files:
+            zipped = is_zip_upload(file)
+            limit = MAX_BATCH_UPLOAD_BYTES - total
+            path = await spool_upload(file, limit if zipped else min(limit, MAX_IMAGE_BYTES))
+            paths.append(path)
+            total += os.path.getsize(path)
+
+            if not zipped:
+                images.append((file.filename, path, None))
+                continue
+            members = await asyncio.to_thread(list_zip_images, path)
+            images.extend((name, path, name) for name in members)
+
+        if len(images) > MAX_BATCH_IMAGES:
+            raise UploadTooLarge(f"Too many images: {len(images)} (max {MAX_BATCH_IMAGES})")
+    except BaseException:
+        remove_files(paths)
+        raise
+    return paths, images
+
+
+async def submit_when_free(fn, *args):
+    """Submit to the image pool, waiting (instead of failing) while it is saturated."""
+    deadline = asyncio.get_running_loop().time() + BATCH_IMAGE_WAIT_SECONDS
+    while True:
+        try:
+            return await image_executor.submit(fn, *args)
+        except ExecutorSaturated:
+            if asyncio.get_running_loop().time() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+@app.post("/analyze_crop_images/batch",
+          dependencies=[Depends(admission(batch_images_rate_limiter, batch_images_concurrency))])
+async def analyze_crop_images_batch_api(request: Request, files: List[UploadFile] = File(...),
+                                        crop_type: str = "Wheat"):
+    try:
+        paths, images = await collect_batch_images(files)
+    except UploadTooLarge as e:
+        return JSONResponse(content={"error": str(e)}, status_code=413)
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=400)
+    try:
+        await charge_units(request, len(images))
+    except HTTPException:
+        remove_files(paths)
+        raise
+
+    image_analysis = load_image_analysis()
+    # Keep only a few images per batch in the pool so single requests still get through
+    slots = asyncio.Semaphore(image_executor.max_workers)
+
+    async def analyze(index, filename, path, member):
+        async with slots:
+            try:
+                # The worker reads (and for zips, decompresses) the image itself
+                result = await submit_when_free(image_analysis.analyze_stored_image, path, member, crop_type)
+            except ExecutorSaturated:
+                return {"index": index, "filename": filename, "error": "Image analysis is busy"}
+            except Exception as e:
+                return {"index": index, "filename": filename, "error": str(e)}
+        await audit_log.record(audit_record(
+            "/analyze_crop_images/batch", {"crop_type": crop_type, "filename": filename}, result))
+        return {"index": index, "filename": filename, "result": result}
+
+    async def stream():
+        tasks = [asyncio.ensure_future(analyze(i, name, path, member))
+                 for i, (name, path, member) in enumerate(images)]
+        analyses = []
+        failed = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                line = await finished
+                if "result" in line and "error" not in line["result"]:
+                    analyses.append(line["result"])
+                else:
+                    failed += 1
+                yield json.dumps(line) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            remove_files(paths)
+
+        summary = image_analysis.summarize_field(analyses)
+        summary["failed"] = failed
+        yield json.dumps({"summary": summary}) + "\n"
+
+    # The background task also cleans up if the client goes away before streaming starts
+    return StreamingResponse(stream(), media_type="application/x-ndjson",
+                             background=BackgroundTask(remove_files, paths))
+
+
+# ==============================
+# Metrics Collectors
+# ==============================
+def collect_runtime_metrics():
+    """Cache, pool and batcher state, read at scrape time."""
+    caches = (("weather", weather_cache), ("auth_user", user_cache), ("auth_token", token_service.cache),
+              ("prediction", prediction_cache))
+    for name, cache in caches:
+        if cache is None:
+            continue
+        stats = cache.stats()
+        labels = {"cache": name}
+        yield "cache_hits_total", "counter", "Cache hits", labels, stats["hits"] + stats.get("stale_hits", 0)
+        yield "cache_misses_total", "counter", "Cache misses", labels, stats["misses"]
+        yield "cache_entries", "gauge", "Entries currently cached", labels, stats["size"]
+
+    for executor in (image_executor, password_executor, batch_executor):
+        stats = executor.stats()
+        labels = {"pool": executor.name}
+        yield "executor_queue_depth", "gauge", "Jobs waiting for a worker", labels, stats["queue_depth"]
+        yield "executor_in_flight", "gauge", "Jobs queued or running", labels, stats["in_flight"]
+        yield "executor_rejected_total", "counter", "Jobs rejected because the pool was saturated", labels, stats["rejected"]
+
+    yield "yield_batcher_batches_total", "counter", "Micro-batches scored", {}, yield_batcher.batches
+    yield "yield_batcher_rows_total", "counter", "Rows scored through the micro-batcher", {}, yield_batcher.rows
+    age = weather_snapshot.oldest_age()
+    if age is not None:
+        yield "weather_snapshot_age_seconds", "gauge", "Age of the oldest city in the weather snapshot", {}, age
+    yield "weather_refresh_failures_total", "counter", "City weather fetches that failed during refresh", {}, weather_snapshot.failures
+    yield "weather_snapshot_too_old_total", "counter", "Snapshot reads skipped for being older than the max age", {}, weather_snapshot.too_old
+
+    for route, limiter, concurrency in (("/predict_yield", predict_rate_limiter, predict_concurrency),
+                                        ("/analyze_crop_image", image_rate_limiter, image_concurrency)):
+        labels = {"route": route}
+        yield "rate_limited_total", "counter", "Requests refused by the per-client rate limit", labels, limiter.limited
+        yield "route_in_flight", "gauge", "Requests holding a route concurrency slot", labels, concurrency.in_flight
+        yield "route_concurrency_rejected_total", "counter", "Requests refused because the route was at its concurrency limit", labels, concurrency.rejected
+
+    stats = audit_log.stats()
+    yield "audit_log_pending", "gauge", "Audit records waiting to be written", {}, stats["pending"]
+    yield "audit_log_written_total", "counter", "Audit records written to MongoDB", {}, stats["written"]
+    yield "audit_log_dropped_total", "counter", "Audit records dropped because the buffer was full", {}, stats["dropped"]
+    yield "audit_log_failed_total", "counter", "Audit records lost to failed writes", {}, stats["failed"]
+    yield "model_info", "gauge", "Active model version", {"version": model_registry.active.version}, 1
+
+
+metrics.register_collector(collect_runtime_metrics)
@@ -1,8 +1,12 @@
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
+from datetime import datetime, timedelta, timezone
+from jose import JWTError, jwk, jwt
 from passlib.context import CryptContext
 from dotenv import load_dotenv
+import hashlib
 import os
+import time
+
+from cache import LRUCache
 
 load_dotenv()
 
@@ -10,6 +14,18 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
 
+# Asymmetric algorithms (RS256, ES256, ...) sign with a private key and verify
+# with the public one; a service that only verifies tokens needs just the public key.
+# Each can be given inline (PEM) or as a file path.
+JWT_PRIVATE_KEY = os.getenv("JWT_PRIVATE_KEY")
+JWT_PRIVATE_KEY_FILE = os.getenv("JWT_PRIVATE_KEY_FILE")
+JWT_PUBLIC_KEY = os.getenv("JWT_PUBLIC_KEY")
+JWT_PUBLIC_KEY_FILE = os.getenv("JWT_PUBLIC_KEY_FILE")
+
+# Verified claims are reused for at most this long (and never past "exp")
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 60))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Hash password
@@ -20,18 +36,109 @@ def get_password_hash(password):
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+
+def read_key(value, path):
+    if value:
+        return value.replace("\\n", "\n")
+    if path:
+        with open(path) as f:
+            return f.read()
+    return None
+
+
+class TokenService:
+    """Issue and verify JWTs with keys parsed once, caching verified claims.
+
+    The cache is keyed by a SHA-256 of the token, so raw tokens are not kept
+    in memory, and an entry is only reused until the earlier of the token's
+    "exp" and cache_ttl seconds after it was verified.
+    """
+
+    def __init__(self, algorithm="HS256", secret_key=None, private_key=None, public_key=None,
+                 expire_minutes=60, cache_ttl=60, cache_size=10000):
+        self.algorithm = algorithm
+        self.expire_minutes = expire_minutes
+        self.cache_ttl = cache_ttl
+        self.cache = LRUCache(cache_size) if cache_ttl > 0 and cache_size > 0 else None
+        self.expired = 0
+
+        if algorithm.startswith("HS"):
+            signing_key = verify_key = secret_key and jwk.construct(secret_key, algorithm)
+        else:
+            signing_key = private_key and jwk.construct(private_key, algorithm)
+            if public_key:
+                verify_key = jwk.construct(public_key, algorithm)
+            else:
+                verify_key = signing_key and signing_key.public_key()
+        self.signing_key = signing_key
+        self.verify_key = verify_key
+
+    def create_access_token(self, data: dict, expires_delta: timedelta = None):
+        if self.signing_key is None:
+            raise RuntimeError(f"No signing key configured for {self.algorithm}")
+        to_encode = data.copy()
+        expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=self.expire_minutes))
+        to_encode.update({"exp": expire})
+        return jwt.encode(to_encode, self.signing_key, algorithm=self.algorithm)
+
+    def decode(self, token: str):
+        """Verify signature and claims without the cache; raises JWTError."""
+        if self.verify_key is None:
+            raise JWTError(f"No verification key configured for {self.algorithm}")
+        return jwt.decode(token, self.verify_key, algorithms=[self.algorithm])
+
+    def verify_token(self, token: str):
+        """Return the token's claims, or None if it is invalid or expired."""
+        if self.cache is None:
+            try:
+                return self.decode(token)
+            except JWTError:
+                return None
+
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        entry = self.cache.get(key)
+        if entry is not None:
+            claims, valid_until = entry
+            if now < valid_until:
+                # Copy so a caller can't modify the cached claims
+                return dict(claims)
+            self.expired += 1
+
+        try:
+            claims = self.decode(token)
+        except JWTError:
+            return None
+        valid_until = now + self.cache_ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            valid_until = min(valid_until, exp)
+        self.cache.put(key, (claims, valid_until))
+        return dict(claims)
+
+    def clear_cache(self):
+        if self.cache is not None:
+            self.cache.clear()
+
+    def stats(self):
+        stats = self.cache.stats() if self.cache is not None else {}
+        return {"algorithm": self.algorithm, "cache_ttl": self.cache_ttl, "expired": self.expired, **stats}
+
+
+token_service = TokenService(
+    algorithm=ALGORITHM,
+    secret_key=SECRET_KEY,
+    private_key=read_key(JWT_PRIVATE_KEY, JWT_PRIVATE_KEY_FILE),
+    public_key=read_key(JWT_PUBLIC_KEY, JWT_PUBLIC_KEY_FILE),
+    expire_minutes=ACCESS_TOKEN_EXPIRE_MINUTES,
+    cache_ttl=TOKEN_CACHE_TTL,
+    cache_size=TOKEN_CACHE_SIZE,
+)
+
 # Create JWT token
 def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return token_service.create_access_token(data, expires_delta)
 
 # Verify JWT token
 def verify_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
-        return None
+    return token_service.verify_token(token)
@@ -0,0 +1,98 @@
+# batcher.py
+import asyncio
+
+import numpy as np
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    """Merge concurrent single-row predictions into one model call.
+
+    The first row to arrive opens a window of `window_ms`; every row that
+    arrives before it closes (or until `max_batch_size` rows are waiting)
+    is scored together by `predict_fn(matrix, context)`, which must return
+    one result per row. Rows are grouped by the `context` they were
+    submitted with (e.g. the model they were encoded for), so one flush
+    makes one call per distinct context. Each caller gets its own result back.
+    """
+
+    def __init__(self, predict_fn, window_ms=2.0, max_batch_size=64):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._rows = []
+        self._contexts = []
+        self._futures = []
+        self._timer = None
+        self.batches = 0
+        self.rows = 0
+        self.max_seen = 0
+        self.size_histogram = {bound: 0 for bound in BATCH_SIZE_BUCKETS}
+        self.size_histogram["+Inf"] = 0
+
+    async def submit(self, row, context=None):
+        """Queue one feature row (1-D, copied) and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._rows.append(np.array(row, dtype=np.float32).ravel())
+        self._contexts.append(context)
+        self._futures.append(future)
+
+        if len(self._rows) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        rows, contexts, futures = self._rows, self._contexts, self._futures
+        self._rows, self._contexts, self._futures = [], [], []
+
+        groups = {}
+        for row, context, future in zip(rows, contexts, futures):
+            group_rows, group_futures = groups.setdefault(context, ([], []))
+            group_rows.append(row)
+            group_futures.append(future)
+        for context, (group_rows, group_futures) in groups.items():
+            self._predict_group(context, group_rows, group_futures)
+
+    def _predict_group(self, context, rows, futures):
+        self._record(len(rows))
+        try:
+            results = self.predict_fn(np.stack(rows), context)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            if not future.done():   # caller may have been cancelled
+                future.set_result(result)
+
+    def _record(self, size):
+        self.batches += 1
+        self.rows += size
+        self.max_seen = max(self.max_seen, size)
+        for bound in BATCH_SIZE_BUCKETS:
+            if size <= bound:
+                self.size_histogram[bound] += 1
+                break
+        else:
+            self.size_histogram["+Inf"] += 1
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.rows / self.batches, 3) if self.batches else 0.0,
+            "max_batch_size_seen": self.max_seen,
+            "batch_size_histogram": {str(k): v for k, v in self.size_histogram.items()},
+            "pending": len(self._rows),
+        }
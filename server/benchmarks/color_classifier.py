@@ -0,0 +1,48 @@
+# benchmarks/color_classifier.py
+# Time the fused LUT colour classifier against the per-class inRange masks;
+# tests/test_color_classifier.py checks that both count the same.
+#
+#   cd server && python -m benchmarks.color_classifier
+import json
+import time
+
+import numpy as np
+
+from image_analysis import count_color_classes_lut, count_color_classes_masks
+
+SIZES = [(256, 256), (1024, 1024), (2048, 2048)]
+REPEATS = 50
+
+
+def random_hsv(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    h = rng.integers(0, 180, shape, dtype=np.uint8)
+    sv = rng.integers(0, 256, shape + (2,), dtype=np.uint8)
+    return np.dstack([h, sv])
+
+
+def time_call(fn, hsv, repeats=REPEATS):
+    fn(hsv)  # warm-up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(hsv)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    for shape in SIZES:
+        hsv = random_hsv(shape)
+        masks = time_call(count_color_classes_masks, hsv)
+        lut = time_call(count_color_classes_lut, hsv)
+        print(json.dumps({
+            "size": f"{shape[1]}x{shape[0]}",
+            "masks_median_ms": round(float(np.median(masks)) * 1000, 3),
+            "lut_median_ms": round(float(np.median(lut)) * 1000, 3),
+            "speedup": round(float(np.median(masks) / np.median(lut)), 2),
+        }))
+
+
+if __name__ == "__main__":
+    main()
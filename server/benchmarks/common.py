@@ -0,0 +1,60 @@
+# benchmarks/common.py
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+# Safe offline defaults; must be set before `app` is imported
+os.environ.setdefault("DB_NAME", "benchmark")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+# Benchmarks drive the API from one address; admission control would cap them
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+SAMPLE_ROW = {
+    "Crop": "Rice", "State": "Punjab", "Year": 2024, "N": 40, "P": 20, "K": 30, "pH": 6.5,
+    "soil_type": "Loamy", "Fertilizer_Type": "Organic", "Fertilizer_Amount": 40,
+    "Pesticide_Amount": 3, "sowing_date": "2024-06-01", "area": 2,
+}
+
+
+def summarize(name, samples, wall_seconds=None, **extra):
+    """Latency percentiles (ms) and throughput for a list of per-call durations (s)."""
+    ms = np.array(samples) * 1000
+    wall = wall_seconds if wall_seconds is not None else float(np.sum(samples))
+    return {
+        "name": name,
+        "count": len(samples),
+        "throughput_per_s": round(len(samples) / wall, 2) if wall else None,
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p90_ms": round(float(np.percentile(ms, 90)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+        **extra,
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_weather_stub(port=None):
+    """Run weather_stub.app in a background thread; returns its base weather URL."""
+    import uvicorn
+
+    import weather_stub
+
+    port = port or free_port()
+    server = uvicorn.Server(uvicorn.Config(weather_stub.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("weather stub did not start")
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/data/2.5/weather"
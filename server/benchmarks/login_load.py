@@ -0,0 +1,70 @@
+# benchmarks/login_load.py
+# Load test: /predict_yield latency while a burst of logins runs bcrypt.
+#
+#   cd server && python -m benchmarks.login_load --logins 40 --predictions 400
+#
+# Runs the app in-process on one event loop (like one uvicorn worker) with an
+# in-memory Mongo stand-in (pip install mongomock-motor), so it needs no
+# database, network or OpenWeather key.
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from mongomock_motor import AsyncMongoMockClient
+
+from benchmarks.common import SAMPLE_ROW, summarize  # sets offline env defaults first
+import app as server
+
+USER = {"username": "bench", "email": "bench@example.com", "password": "bench-password"}
+
+
+async def predict_loop(client, count, concurrency):
+    latencies = []
+    remaining = iter(range(count))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            resp = await client.post("/predict_yield", json=SAMPLE_ROW)
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def login_burst(client, count):
+    login = {"email": USER["email"], "password": USER["password"]}
+    results = await asyncio.gather(*(client.post("/login", json=login) for _ in range(count)))
+    return sum(1 for r in results if r.status_code == 200)
+
+
+async def main(args):
+    server.users_collection = AsyncMongoMockClient()["benchmark"]["users"]
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        (await client.post("/signup", json=USER)).raise_for_status()
+
+        baseline = await predict_loop(client, args.predictions, args.concurrency)
+        burst = asyncio.ensure_future(login_burst(client, args.logins))
+        under_load = await predict_loop(client, args.predictions, args.concurrency)
+        ok_logins = await burst
+
+    print(json.dumps({
+        "benchmark": "predict_yield_during_logins",
+        "logins": args.logins,
+        "successful_logins": ok_logins,
+        "password_workers": server.password_executor.max_workers,
+        "baseline": summarize("predict_yield_baseline", baseline),
+        "during_logins": summarize("predict_yield_during_logins", under_load),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/predict_yield latency during a login burst")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--predictions", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,231 @@
+# benchmarks/run.py
+# Offline benchmark suite for the API hot paths, with machine-readable output.
+#
+#   cd server && python -m benchmarks.run --output bench.json
+#   python -m benchmarks.run --compare bench.json        # fail on regressions
+#
+# Weather comes from weather_stub.py on a local port and Mongo from
+# mongomock-motor, so nothing leaves the machine.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import SAMPLE_ROW, start_weather_stub, summarize
+
+# Point the app at the local stub before it reads its settings on import
+os.environ["OPENWEATHER_KEY"] = "stub"
+os.environ["OPENWEATHER_URL"] = start_weather_stub()
+os.environ.setdefault("RECOMMENDATION_SEED", "0")
+
+import cv2  # noqa: E402
+import httpx  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+import app as server  # noqa: E402
+import auth  # noqa: E402
+from image_analysis import analyze_crop_health_detailed  # noqa: E402
+
+# Benchmarks whose p50 may grow by more than this fraction count as regressions
+DEFAULT_THRESHOLD = 0.25
+
+
+def time_sync(fn, iterations, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return samples, time.perf_counter() - start
+
+
+async def time_async(fn, iterations, concurrency=1, before_each=None, warmup=3):
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    remaining = iter(range(iterations))
+
+    async def worker():
+        for _ in remaining:
+            if before_each is not None:
+                before_each()
+            t = time.perf_counter()
+            await fn()
+            samples.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def clear_caches():
+    server.prediction_cache.clear()
+    server.weather_cache.invalidate()
+
+
+def encoded_image(size, seed=0):
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    img[: size // 2] = (40, 160, 40)   # some structure so JPEG sizes are realistic
+    ok, buf = cv2.imencode(".jpg", img)
+    return buf.tobytes()
+
+
+async def bench_api(scale):
+    results = []
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def predict():
+            (await client.post("/predict_yield", json=SAMPLE_ROW)).raise_for_status()
+
+        samples, wall = await time_async(predict, 200 * scale, before_each=clear_caches)
+        results.append(summarize("predict_yield_single_cold", samples, wall))
+        samples, wall = await time_async(predict, 500 * scale)
+        results.append(summarize("predict_yield_single_warm", samples, wall))
+        samples, wall = await time_async(predict, 1000 * scale, concurrency=16)
+        results.append(summarize("predict_yield_single_warm_c16", samples, wall))
+
+        rows = [dict(SAMPLE_ROW, N=float(n), area=1 + n % 5) for n in range(1000)]
+
+        async def predict_batch():
+            (await client.post("/predict_yield/batch", json=rows)).raise_for_status()
+
+        samples, wall = await time_async(predict_batch, 10 * scale)
+        results.append(summarize("predict_yield_batch_1000", samples, wall, rows_per_call=len(rows)))
+    return results
+
+
+async def bench_weather(scale):
+    results = []
+
+    async def fetch():
+        await server.fetch_weather("Punjab")
+
+    samples, wall = await time_async(fetch, 100 * scale, before_each=server.weather_cache.invalidate)
+    results.append(summarize("fetch_weather_stub_cold", samples, wall))
+    samples, wall = await time_async(fetch, 1000 * scale)
+    results.append(summarize("fetch_weather_cached", samples, wall))
+
+    # What requests see once the background refresher has filled the snapshot
+    await server.weather_snapshot.refresh()
+    samples, wall = await time_async(fetch, 1000 * scale)
+    results.append(summarize("fetch_weather_snapshot", samples, wall))
+    return results
+
+
+def bench_images(scale):
+    results = []
+    for size in (256, 1024, 2048, 4096):
+        data = encoded_image(size)
+        samples, wall = time_sync(lambda: analyze_crop_health_detailed(data), max(3, 40 * scale * 256 // size))
+        results.append(summarize(f"analyze_crop_health_{size}px", samples, wall, jpeg_bytes=len(data)))
+    return results
+
+
+def bench_auth(scale):
+    results = []
+    hashed = auth.get_password_hash("bench-password")
+    samples, wall = time_sync(lambda: auth.get_password_hash("bench-password"), 3 * scale, warmup=0)
+    results.append(summarize("bcrypt_hash", samples, wall))
+    samples, wall = time_sync(lambda: auth.verify_password("bench-password", hashed), 3 * scale, warmup=0)
+    results.append(summarize("bcrypt_verify", samples, wall))
+
+    token = auth.create_access_token({"sub": "bench@example.com"})
+    samples, wall = time_sync(lambda: auth.create_access_token({"sub": "bench@example.com"}), 2000 * scale)
+    results.append(summarize("jwt_create", samples, wall))
+    samples, wall = time_sync(lambda: auth.token_service.decode(token), 2000 * scale)
+    results.append(summarize("jwt_verify_uncached", samples, wall))
+    samples, wall = time_sync(lambda: auth.verify_token(token), 2000 * scale)
+    results.append(summarize("jwt_verify", samples, wall))
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print p50 changes per benchmark; return the names that regressed."""
+    before = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = before.get(result["name"])
+        if old is None or not old["p50_ms"]:
+            continue
+        change = result["p50_ms"] / old["p50_ms"] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{result['name']:<36} p50 {old['p50_ms']:>10.4f} -> {result['p50_ms']:>10.4f} ms "
+              f"({change:+.1%}) {flag}", file=sys.stderr)
+        if flag:
+            regressions.append(result["name"])
+    return regressions
+
+
+async def run_groups(groups, scale):
+    # One event loop for everything: the pooled HTTP client is bound to it
+    results = []
+    try:
+        if "api" in groups:
+            results += await bench_api(scale)
+        if "weather" in groups:
+            results += await bench_weather(scale)
+        if "images" in groups:
+            results += bench_images(scale)
+        if "auth" in groups:
+            results += bench_auth(scale)
+    finally:
+        await server.close_http_client()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API hot paths offline")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed p50 slowdown before a benchmark counts as a regression")
+    parser.add_argument("--scale", type=int, default=1, help="multiply iteration counts")
+    parser.add_argument("--only", nargs="*", choices=["api", "weather", "images", "auth"])
+    args = parser.parse_args()
+
+    server.users_collection = AsyncMongoMockClient()["benchmark"]["users"]
+    groups = args.only or ["api", "weather", "images", "auth"]
+
+    results = asyncio.run(run_groups(groups, args.scale))
+    report = {"environment": environment(), "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
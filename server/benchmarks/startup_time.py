@@ -0,0 +1,72 @@
+# benchmarks/startup_time.py
+# How long each piece of server start-up takes, measured in fresh interpreters.
+#
+#   cd server && python -m benchmarks.startup_time
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ENV = dict(os.environ, DB_NAME=os.getenv("DB_NAME", "benchmark"),
+           MONGO_URL=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+
+# Each step runs after the previous ones in the same interpreter, so its time
+# is what it adds on top (shared dependencies are only counted once).
+IMPORT_STEPS = [
+    ("numpy", "import numpy"),
+    ("pandas", "import pandas"),
+    ("xgboost", "import xgboost"),
+    ("fastapi", "import fastapi"),
+    ("motor", "import motor.motor_asyncio"),
+    ("httpx", "import httpx"),
+    ("cv2", "import cv2"),
+]
+
+TIMED_STEPS = """
+import json, sys, time
+timings = {}
+for name, stmt in STEPS:
+    start = time.perf_counter()
+    exec(stmt)
+    timings[name] = round((time.perf_counter() - start) * 1000, 2)
+print(json.dumps(timings))
+"""
+
+
+def run_steps(steps):
+    code = f"STEPS = {steps!r}\n" + TIMED_STEPS
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         env=ENV, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    report = {"imports_ms": run_steps(IMPORT_STEPS)}
+
+    load = "import xgboost as xgb; b = xgb.Booster(); b.load_model({!r})"
+    model_steps = [("import_xgboost", "import xgboost")]
+    model_steps.append(("load_json", load.format("crop_yield_model.json")))
+    with tempfile.TemporaryDirectory() as tmp:
+        ubj_path = os.path.join(tmp, "crop_yield_model.ubj")
+        subprocess.run([sys.executable, "model_registry.py", "crop_yield_model.json", ubj_path],
+                       capture_output=True, env=ENV, check=True)
+        model_steps.append(("load_ubj", load.format(ubj_path)))
+        report["model_load_ms"] = run_steps(model_steps)
+
+        # Whole app import (what uvicorn waits for), JSON vs UBJ model
+        app_import = [("import_app", "import app")]
+        report["app_import_json_ms"] = run_steps(app_import)["import_app"]
+        ENV["MODEL_PATH"] = ubj_path
+        report["app_import_ubj_ms"] = run_steps(app_import)["import_app"]
+        del ENV["MODEL_PATH"]
+
+    # cv2 should only be imported when an image route is first used
+    out = subprocess.run([sys.executable, "-c", "import sys, app; print('cv2' in sys.modules)"],
+                         capture_output=True, text=True, env=ENV, check=True)
+    report["cv2_imported_at_startup"] = out.stdout.strip().splitlines()[-1] == "True"
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
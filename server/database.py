@@ -1,6 +1,8 @@
 # database.py
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
+from collections import deque
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,7 +10,194 @@ load_dotenv()
 MONGO_URL = os.getenv("MONGO_URL")
 DB_NAME = os.getenv("DB_NAME")
 
-client = AsyncIOMotorClient(MONGO_URL)
+# Connection pool settings
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+)
 db = client[DB_NAME]
 
-users_collection = db["users"]
\ No newline at end of file
+users_collection = db["users"]
+
+# Prediction / image analysis results, kept for traceability and retraining
+AUDIT_COLLECTION = os.getenv("AUDIT_COLLECTION", "prediction_audit")
+audit_collection = db[AUDIT_COLLECTION]
+
+
+async def ensure_indexes():
+    # Unique email index: lookups by email stop being collection scans,
+    # and concurrent signups for the same email can't both succeed.
+    await users_collection.create_index("email", unique=True, name="email_unique")
+
+
+async def check_database():
+    """Raise if MongoDB is unreachable; used by the readiness probe."""
+    await db.command("ping")
+
+
+# ==============================
+# Write-behind Audit Log
+# ==============================
+AUDIT_LOG_ENABLED = os.getenv("AUDIT_LOG_ENABLED", "1") == "1"
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 500))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", 1.0))
+AUDIT_MAX_PENDING = int(os.getenv("AUDIT_MAX_PENDING", 10000))
+# What to do when the buffer is full: drop_oldest, drop_newest or block
+AUDIT_OVERFLOW = os.getenv("AUDIT_OVERFLOW", "drop_oldest")
+# With "block", how long a request waits for room before its record is dropped
+AUDIT_BLOCK_TIMEOUT = float(os.getenv("AUDIT_BLOCK_TIMEOUT", 0.5))
+AUDIT_SHUTDOWN_TIMEOUT = float(os.getenv("AUDIT_SHUTDOWN_TIMEOUT", 10))
+
+AUDIT_OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class AuditLog:
+    """Buffer documents in memory and write them with insert_many.
+
+    A flush happens when batch_size records are pending or every
+    flush_interval seconds, whichever comes first. At most max_pending
+    records are held; past that the overflow policy decides whether the
+    oldest or newest record is dropped, or whether the caller waits
+    (up to block_timeout) for the flusher to make room. Writes that fail
+    are counted and dropped rather than retried, so a Mongo outage costs
+    audit records, never request latency or unbounded memory.
+    """
+
+    def __init__(self, collection, batch_size=500, flush_interval=1.0, max_pending=10000,
+                 overflow="drop_oldest", block_timeout=0.5, enabled=True):
+        if overflow not in AUDIT_OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown audit overflow policy {overflow!r}")
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max(max_pending, batch_size)
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.enabled = enabled
+
+        self._pending = deque()
+        self._wakeup = None
+        self._space = None
+        self._task = None
+        self._closing = False
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=10):
+        """Stop the background flusher after it writes whatever is still buffered."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            print(f"Audit log shutdown flush timed out; {len(self._pending)} records lost")
+            self.dropped += len(self._pending)
+            self._pending.clear()
+        self._task = None
+
+    async def record(self, document):
+        """Queue a document; returns False if it was dropped."""
+        if not self.enabled:
+            return False
+
+        if len(self._pending) >= self.max_pending:
+            if self.overflow == "drop_oldest":
+                self._pending.popleft()
+                self.dropped += 1
+            elif self.overflow == "drop_newest" or not await self._wait_for_space():
+                self.dropped += 1
+                return False
+
+        self._pending.append(document)
+        self.recorded += 1
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    async def _wait_for_space(self):
+        if self._task is None or self._closing:
+            return False
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.block_timeout
+        while len(self._pending) >= self.max_pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            self._space.clear()
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._space.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def flush(self):
+        while self._pending:
+            n = min(self.batch_size, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(n)]
+            if self._space is not None:
+                self._space.set()
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                self.written += n
+            except Exception as e:
+                self.failed += n
+                print(f"Audit log write of {n} records failed:", e)
+            self.batches += 1
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+        await self.flush()
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "overflow": self.overflow,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+audit_log = AuditLog(
+    audit_collection,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval=AUDIT_FLUSH_INTERVAL,
+    max_pending=AUDIT_MAX_PENDING,
+    overflow=AUDIT_OVERFLOW,
+    block_timeout=AUDIT_BLOCK_TIMEOUT,
+    enabled=AUDIT_LOG_ENABLED,
+)
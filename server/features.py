@@ -0,0 +1,72 @@
+# features.py
+import json
+import os
+import threading
+
+import numpy as np
+
+FEATURE_COLUMNS = ['Crop', 'State', 'Year', 'N', 'P', 'K', 'pH', 'soil_type',
+                   'Fertilizer_Type', 'Fertilizer_Amount', 'Pesticide_Amount', 'area']
+CATEGORICAL_COLS = ['Crop', 'State', 'soil_type', 'Fertilizer_Type']
+_COLUMN_LAYOUT = [(j, col, col in CATEGORICAL_COLS) for j, col in enumerate(FEATURE_COLUMNS)]
+
+# Code given to categories that are not in the vocabulary
+UNKNOWN_CATEGORY_CODE = -1
+
+CATEGORY_VOCAB_PATH = os.getenv("CATEGORY_VOCAB_PATH", "crop_yield_vocab.json")
+
+
+def load_category_vocab(path=CATEGORY_VOCAB_PATH):
+    """Load the frozen category -> code table shipped next to the model.
+
+    The file lists the known values of each categorical column; a value's
+    code is its position in that list (sorted, like pandas category codes).
+    """
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {col: {value: code for code, value in enumerate(raw[col])} for col in CATEGORICAL_COLS}
+
+
+try:
+    CATEGORY_VOCAB = load_category_vocab()
+    print("Category vocabulary loaded successfully!")
+except FileNotFoundError:
+    print(f"Error: '{CATEGORY_VOCAB_PATH}' not found. Place it next to the model file.")
+    raise
+
+
+def encode_category(col, value):
+    return CATEGORY_VOCAB[col].get(value, UNKNOWN_CATEGORY_CODE)
+
+
+def encode_features(df_input):
+    """Turn raw YieldInput rows into the numeric frame the booster expects."""
+    df_input = df_input[FEATURE_COLUMNS].copy()
+    for col in CATEGORICAL_COLS:
+        df_input[col] = (
+            df_input[col].map(CATEGORY_VOCAB[col]).fillna(UNKNOWN_CATEGORY_CODE).astype("int32")
+        )
+    return df_input
+
+
+_row_buffers = threading.local()
+
+
+def build_feature_row(input_data, n_features):
+    """Write one YieldInput dict into a reusable (1, n_features) float32 buffer.
+
+    Columns past FEATURE_COLUMNS stay NaN, which the booster treats as
+    missing, exactly like the narrower DataFrame fed to DMatrix. The buffer
+    is per thread and overwritten on the next call, so predict on it
+    before building another row.
+    """
+    buf = getattr(_row_buffers, "buf", None)
+    if buf is None or buf.shape[1] != n_features:
+        buf = np.full((1, n_features), np.nan, dtype=np.float32)
+        _row_buffers.buf = buf
+
+    row = buf[0]
+    for j, col, is_categorical in _COLUMN_LAYOUT:
+        value = input_data[col]
+        row[j] = encode_category(col, value) if is_categorical else value
+    return buf
@@ -0,0 +1,503 @@
+# image_analysis.py
+import io
+import os
+import random
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import BmpImagePlugin, Image, TiffImagePlugin
+
+
+# Images are analysed at this size, so decoding more pixels is wasted work
+ANALYSIS_SIZE = 256
+
+# Let the JPEG decoder downscale by 2/4/8 while decoding
+IMAGE_REDUCED_DECODE = os.getenv("IMAGE_REDUCED_DECODE", "true").lower() == "true"
+
+_REDUCED_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+
+def _decode_flag(data):
+    """Largest reduction that still leaves at least ANALYSIS_SIZE px per side."""
+    if not IMAGE_REDUCED_DECODE:
+        return cv2.IMREAD_COLOR
+    try:
+        # Only parses the header, the pixels are not decoded
+        width, height = Image.open(io.BytesIO(data)).size
+    except Exception:
+        return cv2.IMREAD_COLOR
+    for factor, flag in _REDUCED_FLAGS:
+        if min(width, height) // factor >= ANALYSIS_SIZE:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_image(data):
+    """Decode an encoded image (bytes) straight from memory; None if unreadable."""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if buf.size == 0:
+        return None
+    return cv2.imdecode(buf, _decode_flag(data))
+
+
+def load_image(source):
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return decode_image(source)
+    return cv2.imread(source)
+
+
+# ==============================
+# Colour classification
+# ==============================
+# (name, HSV lower, HSV upper), inclusive like cv2.inRange. Ranges overlap,
+# so one pixel can count towards several classes.
+COLOR_CLASSES = [
+    ("green", (25, 40, 40), (95, 255, 255)),
+    ("yellow", (20, 100, 100), (40, 255, 255)),
+    ("brown", (10, 50, 20), (20, 255, 100)),
+    ("gray", (0, 0, 40), (180, 50, 180)),
+]
+
+# "lut" labels every pixel with all its classes at once, "masks" runs one inRange per class
+IMAGE_COLOR_CLASSIFIER = os.getenv("IMAGE_COLOR_CLASSIFIER", "lut")
+
+
+def count_color_classes_masks(hsv):
+    counts = []
+    for _, lower, upper in COLOR_CLASSES:
+        mask = cv2.inRange(hsv, lower, upper)
+        counts.append(int(np.sum(mask > 0)))
+    return tuple(counts)
+
+
+def _build_channel_luts():
+    # Each class is a box in HSV space, so membership splits per channel:
+    # bit k of luts[c][x] says whether value x of channel c lies in class k.
+    values = np.arange(256)
+    luts = []
+    for channel in range(3):
+        lut = np.zeros(256, dtype=np.uint8)
+        for bit, (_, lower, upper) in enumerate(COLOR_CLASSES):
+            inside = (values >= lower[channel]) & (values <= upper[channel])
+            lut[inside] |= 1 << bit
+        luts.append(lut)
+    return luts
+
+
+_H_LUT, _S_LUT, _V_LUT = _build_channel_luts()
+_NUM_CODES = 1 << len(COLOR_CLASSES)
+# _CODE_BITS[code, k] == 1 when class k is set in a pixel's class code
+_CODE_BITS = (np.arange(_NUM_CODES)[:, None] >> np.arange(len(COLOR_CLASSES))) & 1
+
+
+def count_color_classes_lut(hsv):
+    """Label every pixel with a bitmask of its classes, then count all classes from one histogram."""
+    h, s, v = cv2.split(hsv)
+    codes = cv2.bitwise_and(cv2.bitwise_and(cv2.LUT(h, _H_LUT), cv2.LUT(s, _S_LUT)), cv2.LUT(v, _V_LUT))
+    histogram = cv2.calcHist([codes], [0], None, [_NUM_CODES], [0, _NUM_CODES]).ravel()
+    return tuple(int(count) for count in histogram @ _CODE_BITS)
+
+
+def count_color_classes(hsv, method=None):
+    """Pixel counts for (green, yellow, brown, gray) in an 8-bit HSV image."""
+    if (method or IMAGE_COLOR_CLASSIFIER) == "masks":
+        return count_color_classes_masks(hsv)
+    return count_color_classes_lut(hsv)
+
+
+# ==============================
+# Analysis
+# ==============================
+def analyze_crop_health_timed(image, crop_type="Wheat"):
+    """Like analyze_crop_health_detailed, also returning per-stage seconds.
+
+    Timings are returned rather than recorded so this works in a process pool.
+    """
+    timings = {}
+    return analyze_crop_health_detailed(image, crop_type, timings), timings
+
+
+def analyze_crop_health_detailed(image, crop_type="Wheat", timings=None):
+    """Analyse an image given as encoded bytes, a decoded BGR array or a file path."""
+    start = time.perf_counter()
+    img = load_image(image)
+    if timings is not None:
+        timings["decode"] = time.perf_counter() - start
+    if img is None:
+        return {"error": "Image not found!"}
+    start = time.perf_counter()
+
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    img_resized = cv2.resize(img_rgb, (ANALYSIS_SIZE, ANALYSIS_SIZE))
+    hsv = cv2.cvtColor(img_resized, cv2.COLOR_RGB2HSV)
+
+    total_pixels = img_resized.shape[0] * img_resized.shape[1]
+
+    green_count, yellow_count, brown_count, gray_count = count_color_classes(hsv)
+
+    # Ratios
+    green_ratio = green_count / total_pixels
+    yellow_ratio = yellow_count / total_pixels
+    brown_ratio = brown_count / total_pixels
+    gray_ratio = gray_count / total_pixels
+
+    health_score = green_ratio * 100  
+
+    analysis = {
+        "crop_type": crop_type,
+        "health_score_percent": round(health_score, 2),
+        "leaf_conditions": {
+            "healthy_green_percent": round(green_ratio * 100, 2),
+            "yellow_leaves_percent": round(yellow_ratio * 100, 2),
+            "brown_spots_percent": round(brown_ratio * 100, 2),
+            "dry_gray_percent": round(gray_ratio * 100, 2)
+        },
+        "diagnosis": [],
+        "recommendations": []
+    }
+
+    # --- Nitrogen deficiency (yellow) ---
+    if yellow_ratio > 0.05:
+        nitrogen_diag = [
+            "Nitrogen deficiency detected (yellow leaves).",
+            "Leaves show yellowing, likely from low nitrogen.",
+            "Crop may be suffering from nitrogen stress.",
+            "Yellowing leaves suggest nitrogen shortage.",
+            "Signs of poor nitrogen nutrition are visible."
+        ]
+        nitrogen_reco = [
+            "Apply nitrogen-rich fertilizer immediately (e.g., urea).",
+            "Use ammonium nitrate or urea to restore nitrogen levels.",
+            "Boost nitrogen with compost or organic fertilizer.",
+            "Add nitrogenous fertilizer to improve leaf greenness.",
+            "Supply additional nitrogen to avoid stunted growth."
+        ]
+        analysis["diagnosis"] += random.sample(nitrogen_diag, k=3)
+        analysis["recommendations"] += random.sample(nitrogen_reco, k=3)
+
+    # --- Disease / pest (brown) ---
+    if brown_ratio > 0.02:
+        disease_diag = [
+            "Possible disease or pest attack (brown spots).",
+            "Brown lesions may indicate fungal infection.",
+            "Pest or disease stress detected on leaves.",
+            "Spotted leaves suggest pathogen activity.",
+            "Crop may be affected by pests or early blight."
+        ]
+        disease_reco = [
+            "Apply suitable fungicide/pesticide for this crop.",
+            "Spray approved fungicides and monitor regularly.",
+            "Seek agri-expert advice for targeted pest control.",
+            "Follow integrated pest management practices.",
+            "Rotate crops to reduce pest and disease pressure."
+        ]
+        analysis["diagnosis"] += random.sample(disease_diag, k=3)
+        analysis["recommendations"] += random.sample(disease_reco, k=3)
+
+    # --- Dry/gray patches ---
+    if gray_ratio > 0.05:
+        gray_diag = [
+            "Signs of drought stress observed.",
+            "Gray patches may indicate dry leaves.",
+            "Possible water shortage symptoms on crop.",
+            "Leaves appear dehydrated or moisture-stressed.",
+            "Soil moisture stress signs detected in foliage."
+        ]
+        gray_reco = [
+            "Increase irrigation and check soil moisture.",
+            "Apply mulching to retain soil water.",
+            "Follow a regular watering schedule.",
+            "Ensure irrigation matches crop growth stage.",
+            "Improve soil moisture retention with organic matter."
+        ]
+        analysis["diagnosis"] += random.sample(gray_diag, k=3)
+        analysis["recommendations"] += random.sample(gray_reco, k=3)
+
+    # --- Healthy crop ---
+    if green_ratio > 0.8 and yellow_ratio < 0.05 and brown_ratio < 0.02 and gray_ratio < 0.05:
+        healthy_diag = [
+            "Crop looks healthy and vigorous.",
+            "Foliage is lush and green.",
+            "Plant canopy appears stress-free.",
+            "Crop is in excellent health condition.",
+            "Overall crop health is good with no major stress."
+        ]
+        healthy_reco = [
+            "Maintain regular irrigation schedule.",
+            "Continue current crop management practices.",
+            "No major action needed, keep monitoring.",
+            "Sustain present practices for stable growth.",
+            "Keep observing for early signs of stress."
+        ]
+        analysis["diagnosis"] += random.sample(healthy_diag, k=3)
+        analysis["recommendations"] += random.sample(healthy_reco, k=3)
+
+    if timings is not None:
+        timings["color_analysis"] = time.perf_counter() - start
+    return analysis
+
+
+def analyze_stored_image(path, member=None, crop_type="Wheat"):
+    """Analyse an image file on disk, or one member of a zip archive on disk.
+
+    Reading happens here, in the worker, so zip decompression stays off the
+    event loop and only one image per worker is held in memory.
+    """
+    if member is None:
+        with open(path, "rb") as f:
+            data = f.read()
+    else:
+        with zipfile.ZipFile(path) as archive:
+            data = archive.read(member)
+    return analyze_crop_health_detailed(data, crop_type)
+
+
+def summarize_field(analyses, percentiles=(10, 25, 50, 75, 90)):
+    """Field-level statistics over many per-image analyses."""
+    analyses = [a for a in analyses if "error" not in a]
+    if not analyses:
+        return {"images": 0}
+
+    health = np.array([a["health_score_percent"] for a in analyses], dtype=float)
+    yellow = np.array([a["leaf_conditions"]["yellow_leaves_percent"] for a in analyses], dtype=float)
+    brown = np.array([a["leaf_conditions"]["brown_spots_percent"] for a in analyses], dtype=float)
+
+    def distribution(values):
+        return {f"p{p}": round(float(v), 2) for p, v in zip(percentiles, np.percentile(values, percentiles))}
+
+    return {
+        "images": len(analyses),
+        "mean_health_score_percent": round(float(health.mean()), 2),
+        "min_health_score_percent": round(float(health.min()), 2),
+        "health_score_percentiles": distribution(health),
+        "yellow_leaves_percentiles": distribution(yellow),
+        "brown_spots_percentiles": distribution(brown),
+    }
+
+
+# ==============================
+# Tiled field maps
+# ==============================
+FIELD_TILE_SIZE = int(os.getenv("FIELD_TILE_SIZE", 512))
+# Threads shared by every field-map job in this process (per process with IMAGE_EXECUTOR=process)
+FIELD_TILE_WORKERS = int(os.getenv("FIELD_TILE_WORKERS", os.cpu_count() or 1))
+# Compressed images have to be decoded whole; refuse anything larger than this
+FIELD_MAX_DECODED_PIXELS = int(os.getenv("FIELD_MAX_DECODED_PIXELS", 100_000_000))
+
+# Uncompressed layouts Pillow reports as "raw" tiles: rawmode -> (bytes per pixel, HSV conversion)
+_RAW_LAYOUTS = {
+    "RGB": (3, cv2.COLOR_RGB2HSV),
+    "BGR": (3, cv2.COLOR_BGR2HSV),
+    "RGBA": (4, cv2.COLOR_RGB2HSV),
+    "RGBX": (4, cv2.COLOR_RGB2HSV),
+    "BGRA": (4, cv2.COLOR_BGR2HSV),
+    "BGRX": (4, cv2.COLOR_BGR2HSV),
+    "L": (1, None),
+}
+
+
+def _open_raw_header(path):
+    # The plugin classes parse the header without Image.open's decompression-bomb
+    # check, which would reject large orthomosaics we never decode in one piece
+    for plugin in (TiffImagePlugin.TiffImageFile, BmpImagePlugin.BmpImageFile):
+        try:
+            return plugin(path)
+        except (SyntaxError, OSError):
+            continue
+    raise ValueError("Not a TIFF or BMP image")
+
+
+class RawTileReader:
+    """Read regions of an uncompressed TIFF/BMP (or a .npy array) through a memory map.
+
+    Only the rows a region touches are paged in, so memory use follows the
+    tile size rather than the image size.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path.lower().endswith(".npy"):
+            array = np.load(path, mmap_mode="r")
+            if array.dtype != np.uint8 or array.ndim not in (2, 3):
+                raise ValueError("Expected a uint8 HxW or HxWx3 BGR array")
+            self.height, self.width = array.shape[:2]
+            conversion = cv2.COLOR_BGR2HSV if array.ndim == 3 else None
+            self._blocks = [((0, 0, self.width, self.height), array, conversion)]
+            return
+
+        im = _open_raw_header(path)
+        with im:
+            self.width, self.height = im.size
+            tiles = list(im.tile)
+        if not tiles or any(t[0] != "raw" for t in tiles):
+            raise ValueError("Image is compressed and cannot be memory-mapped")
+
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        self._blocks = []
+        for _, (x0, y0, x1, y1), offset, args in tiles:
+            # args is rawmode or (rawmode, stride, orientation); stride 0 means packed rows
+            args = args if isinstance(args, tuple) else (args,)
+            rawmode = args[0]
+            stride = args[1] if len(args) > 1 else 0
+            orientation = args[2] if len(args) > 2 else 1
+            if rawmode not in _RAW_LAYOUTS:
+                raise ValueError(f"Unsupported raw pixel layout {rawmode}")
+            bpp, conversion = _RAW_LAYOUTS[rawmode]
+            w, h = x1 - x0, y1 - y0
+            stride = stride or w * bpp
+            rows = data[offset:offset + h * stride].reshape(h, stride)[:, :w * bpp].reshape(h, w, bpp)
+            if orientation < 0:
+                rows = rows[::-1]
+            self._blocks.append(((x0, y0, x1, y1), rows[..., :3] if bpp == 4 else rows, conversion))
+
+    def read_hsv(self, x0, y0, x1, y1):
+        """HSV pixels of the region, as a new array of just that region."""
+        out = np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        for (bx0, by0, bx1, by1), block, conversion in self._blocks:
+            ix0, iy0, ix1, iy1 = max(x0, bx0), max(y0, by0), min(x1, bx1), min(y1, by1)
+            if ix0 >= ix1 or iy0 >= iy1:
+                continue
+            part = np.ascontiguousarray(block[iy0 - by0:iy1 - by0, ix0 - bx0:ix1 - bx0])
+            if conversion is None:
+                part = cv2.cvtColor(part.reshape(part.shape[:2]), cv2.COLOR_GRAY2BGR)
+                conversion = cv2.COLOR_BGR2HSV
+            out[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] = cv2.cvtColor(part, conversion)
+        return out
+
+
+class DecodedTileReader:
+    """Fallback for compressed formats (JPEG, PNG, LZW TIFF): decode once, then slice."""
+
+    def __init__(self, source):
+        if isinstance(source, str):
+            try:
+                with Image.open(source) as im:
+                    width, height = im.size
+            except Image.DecompressionBombError:
+                width = height = FIELD_MAX_DECODED_PIXELS
+            except OSError:
+                raise ValueError("Could not read image")
+            if width * height > FIELD_MAX_DECODED_PIXELS:
+                raise ValueError(
+                    f"{width}x{height} compressed image is too large to decode; "
+                    "upload an uncompressed TIFF so it can be read tile by tile")
+        img = load_image(source)
+        if img is None:
+            raise ValueError("Image not found!")
+        self.height, self.width = img.shape[:2]
+        self._image = img
+
+    def read_hsv(self, x0, y0, x1, y1):
+        return cv2.cvtColor(self._image[y0:y1, x0:x1], cv2.COLOR_BGR2HSV)
+
+
+def open_tile_reader(source):
+    """Memory-mapped reader where the file layout allows it, decoded otherwise."""
+    if isinstance(source, str):
+        try:
+            return RawTileReader(source)
+        except (ValueError, OSError):
+            pass
+    return DecodedTileReader(source)
+
+
+_tile_pool = None
+_tile_pool_lock = threading.Lock()
+
+
+def tile_pool():
+    """The process-wide tile pool, created on first use.
+
+    Concurrent field maps share it, so tile threads stay at FIELD_TILE_WORKERS
+    however many jobs the image executor runs at once.
+    """
+    global _tile_pool
+    with _tile_pool_lock:
+        if _tile_pool is None:
+            _tile_pool = ThreadPoolExecutor(max_workers=FIELD_TILE_WORKERS, thread_name_prefix="field-tiles")
+        return _tile_pool
+
+
+def analyze_field_tiles(source, crop_type="Wheat", tile_size=None):
+    """Per-tile colour-class grid for a large field image plus field-level statistics.
+
+    source is a file path (uncompressed TIFF/BMP or .npy are memory-mapped),
+    encoded bytes or a BGR array. Tiles are classified at full resolution by
+    the shared tile pool; each worker holds one tile at a time.
+    """
+    tile_size = tile_size or FIELD_TILE_SIZE
+    reader = open_tile_reader(source)
+    width, height = reader.width, reader.height
+    rows = -(-height // tile_size)
+    cols = -(-width // tile_size)
+    boxes = [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+
+    def classify(box):
+        hsv = reader.read_hsv(*box)
+        return count_color_classes(hsv), hsv.shape[0] * hsv.shape[1]
+
+    results = list(tile_pool().map(classify, boxes))
+
+    counts = np.array([c for c, _ in results], dtype=np.int64)
+    pixels = np.array([p for _, p in results], dtype=np.int64)
+    percents = 100 * counts / pixels[:, None]
+
+    grid = {}
+    for k, (name, _, _) in enumerate(COLOR_CLASSES):
+        grid[name] = np.round(percents[:, k], 2).reshape(rows, cols).tolist()
+
+    totals = counts.sum(axis=0)
+    green, yellow, brown, gray = (round(100 * int(t) / int(pixels.sum()), 2) for t in totals)
+    health = percents[:, 0]
+
+    # Same thresholds as analyze_crop_health_detailed, applied per tile
+    flagged = {
+        "yellow_leaves": int(np.sum(percents[:, 1] > 5)),
+        "brown_spots": int(np.sum(percents[:, 2] > 2)),
+        "dry_gray": int(np.sum(percents[:, 3] > 5)),
+    }
+    worst = [
+        {"row": int(i // cols), "col": int(i % cols), "bbox": list(boxes[i]),
+         "health_score_percent": round(float(health[i]), 2)}
+        for i in np.argsort(health, kind="stable")[:5]
+    ]
+
+    return {
+        "crop_type": crop_type,
+        "width": width,
+        "height": height,
+        "tile_size": tile_size,
+        "rows": rows,
+        "cols": cols,
+        "memory_mapped": isinstance(reader, RawTileReader),
+        "grid": grid,
+        "summary": {
+            "tiles": len(boxes),
+            "health_score_percent": green,
+            "leaf_conditions": {
+                "healthy_green_percent": green,
+                "yellow_leaves_percent": yellow,
+                "brown_spots_percent": brown,
+                "dry_gray_percent": gray,
+            },
+            "tile_health_percentiles": {
+                f"p{p}": round(float(v), 2) for p, v in zip((10, 25, 50, 75, 90), np.percentile(health, (10, 25, 50, 75, 90)))
+            },
+            "tiles_flagged": flagged,
+            "worst_tiles": worst,
+        },
+    }
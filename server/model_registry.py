@@ -0,0 +1,174 @@
+# model_registry.py
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import xgboost as xgb
+
+
+class LoadedModel:
+    def __init__(self, booster, version, path):
+        self.booster = booster
+        self.version = version
+        self.path = path
+        self.num_features = booster.num_features()
+        self.loaded_at = time.time()
+
+    def info(self):
+        return {
+            "version": self.version,
+            "path": self.path,
+            "num_features": self.num_features,
+            "loaded_at": self.loaded_at,
+        }
+
+
+def file_version(path):
+    """Short content hash, so the same file always gets the same version."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class ReloadInProgress(RuntimeError):
+    """A reload of a different model file is already running."""
+
+
+class ModelRegistry:
+    """Holds the active booster plus the last few versions for rollback.
+
+    Loading and validation run off the event loop; the swap itself is a
+    single attribute assignment, so a request that grabbed `active` keeps
+    using that model until it finishes. reload() activates on the loop
+    thread, so on_activate never runs concurrently with request handlers.
+    """
+
+    def __init__(self, path, keep=3, smoke_batch=None, min_features=0, on_activate=None):
+        self.path = path
+        self.keep = keep
+        self.smoke_batch = smoke_batch
+        self.min_features = min_features
+        self.on_activate = on_activate
+        self.active = None
+        self._history = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._reloading = None
+        self._reloading_path = None
+        # (path, mtime) of the model file last loaded or attempted
+        self._file_state = None
+
+    def load(self, path=None):
+        path = path or self.path
+        booster = xgb.Booster()
+        booster.load_model(path)
+        return LoadedModel(booster, file_version(path), path)
+
+    def validate(self, candidate):
+        if candidate.num_features < self.min_features:
+            raise ValueError(
+                f"Model {candidate.version} expects {candidate.num_features} features, "
+                f"need at least {self.min_features}")
+        if self.smoke_batch is not None:
+            predictions = candidate.booster.predict(xgb.DMatrix(self.smoke_batch))
+            if len(predictions) != len(self.smoke_batch) or not np.all(np.isfinite(predictions)):
+                raise ValueError(f"Model {candidate.version} failed the smoke batch")
+
+    def activate(self, candidate):
+        with self._lock:
+            self._history = deque(
+                [m for m in self._history if m.version != candidate.version], maxlen=self.keep)
+            self._history.append(candidate)
+            self.active = candidate
+            if candidate.path == self.path:
+                self._remember_file_state()
+        if self.on_activate is not None:
+            self.on_activate(candidate)
+        print(f"Model {candidate.version} is now active ({candidate.path}).")
+        return candidate
+
+    def load_and_validate(self, path=None):
+        path = path or self.path
+        if path == self.path:
+            # Recorded before loading, so a file that fails to load or validate
+            # is not retried by the watcher until it changes again
+            self._remember_file_state()
+        candidate = self.load(path)
+        self.validate(candidate)
+        return candidate
+
+    def load_and_activate(self, path=None):
+        return self.activate(self.load_and_validate(path))
+
+    async def reload(self, path=None):
+        """Load, validate and swap in a model without blocking in-flight requests.
+
+        Concurrent reloads of the same file share one load; a reload of a
+        different file while one is running raises ReloadInProgress.
+        """
+        path = path or self.path
+        if self._reloading is not None and not self._reloading.done():
+            if path != self._reloading_path:
+                raise ReloadInProgress(f"Already reloading {self._reloading_path}")
+            return await self._reloading
+        self._reloading_path = path
+        self._reloading = asyncio.ensure_future(self._reload(path))
+        return await self._reloading
+
+    async def _reload(self, path):
+        candidate = await asyncio.to_thread(self.load_and_validate, path)
+        # Activate back on the event loop, so on_activate can touch loop-owned state
+        return self.activate(candidate)
+
+    def rollback(self, version=None):
+        """Re-activate an earlier version (default: the one before the active model)."""
+        with self._lock:
+            candidates = [m for m in self._history if m is not self.active]
+            if version is not None:
+                candidates = [m for m in candidates if m.version == version]
+            if not candidates:
+                raise LookupError(f"No model version to roll back to: {version or 'previous'}")
+            target = candidates[-1]
+        return self.activate(target)
+
+    def _remember_file_state(self):
+        try:
+            self._file_state = (self.path, os.stat(self.path).st_mtime_ns)
+        except OSError:
+            pass
+
+    def file_changed(self):
+        """True if self.path differs from the file last loaded or attempted."""
+        try:
+            return (self.path, os.stat(self.path).st_mtime_ns) != self._file_state
+        except OSError:
+            return False
+
+    def versions(self):
+        return {
+            "active": self.active.version if self.active else None,
+            "available": [m.info() for m in reversed(self._history)],
+        }
+
+
+def convert_model(src, dst):
+    """Re-save a model in the format implied by dst's extension (.ubj = binary UBJSON)."""
+    booster = xgb.Booster()
+    booster.load_model(src)
+    booster.save_model(dst)
+    return file_version(dst)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert an XGBoost model between JSON and UBJ")
+    parser.add_argument("src", nargs="?", default="crop_yield_model.json")
+    parser.add_argument("dst", nargs="?", default="crop_yield_model.ubj")
+    args = parser.parse_args()
+    print(f"Wrote {args.dst} (version {convert_model(args.src, args.dst)})")
@@ -0,0 +1,149 @@
+# rate_limit.py
+# Admission control: per-client token buckets and per-route concurrency caps.
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class MemoryBucketBackend:
+    """Token buckets held in this process, one small tuple per client.
+
+    At most max_keys buckets are kept; the least recently used is evicted
+    first. An evicted client simply starts again with a full bucket.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self.evictions = 0
+
+    async def take(self, key, rate, burst, cost=1):
+        """Take cost tokens; returns (allowed, seconds until they would be available)."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+            self.evictions += 1
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def stats(self):
+        return {"backend": "memory", "keys": len(self._buckets), "max_keys": self.max_keys,
+                "evictions": self.evictions}
+
+
+# GCRA: one key per client holding the "theoretical arrival time" in ms.
+# Runs atomically on the server, using the server clock so all API
+# processes agree; keys expire once the bucket would be full again.
+_GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call("TIME")
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local tat = tonumber(redis.call("GET", KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval * cost
+local allow_at = new_tat - tolerance
+if allow_at > now then
+    return {0, math.ceil(allow_at - now)}
+end
+redis.call("SET", KEYS[1], new_tat, "PX", math.ceil(new_tat - now))
+return {1, 0}
+"""
+
+
+class RedisBucketBackend:
+    """Token buckets shared by every API process through Redis (or anything speaking its protocol)."""
+
+    def __init__(self, url=None, client=None, prefix="ratelimit:"):
+        if client is None:
+            try:
+                import redis.asyncio as redis_asyncio
+            except ImportError:
+                raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the 'redis' package")
+            client = redis_asyncio.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_GCRA_SCRIPT)
+
+    async def take(self, key, rate, burst, cost=1):
+        interval = 1000.0 / rate
+        allowed, retry_ms = await self._script(keys=[self.prefix + key], args=[interval, interval * burst, cost])
+        return bool(allowed), int(retry_ms) / 1000
+
+    def stats(self):
+        return {"backend": "redis", "prefix": self.prefix}
+
+
+class RateLimiter:
+    """Token bucket per client for one route: rate tokens/second, up to burst saved up.
+
+    If the backend fails, requests are let through (and counted) rather than
+    turning a limiter outage into an API outage.
+    """
+
+    def __init__(self, name, backend, rate, burst):
+        self.name = name
+        self.backend = backend
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+
+    async def take(self, client_key, cost=1):
+        if self.rate <= 0:
+            return True, 0.0
+        # A cost above burst could never be met; it waits for a full bucket instead
+        cost = min(cost, self.burst)
+        try:
+            allowed, retry_after = await self.backend.take(f"{self.name}:{client_key}", self.rate, self.burst, cost)
+        except Exception as e:
+            self.errors += 1
+            print(f"Rate limiter backend failed for {self.name}:", e)
+            return True, 0.0
+        if allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        return allowed, retry_after
+
+    def stats(self):
+        return {"rate_per_second": self.rate, "burst": self.burst, "allowed": self.allowed,
+                "limited": self.limited, "backend_errors": self.errors}
+
+
+class ConcurrencyLimit:
+    """At most limit requests of a route in flight; others wait up to wait seconds, then are refused."""
+
+    def __init__(self, limit, wait=0.0):
+        self.limit = limit
+        self.wait = wait
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        if self.wait <= 0 and self._semaphore.locked():
+            self.rejected += 1
+            return False
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.wait or None)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self):
+        return {"limit": self.limit, "in_flight": self.in_flight, "rejected": self.rejected}
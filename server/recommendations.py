@@ -0,0 +1,288 @@
+# recommendations.py
+import bisect
+import os
+
+import numpy as np
+
+# ==============================
+# Messages
+# ==============================
+# One of the variants in each group is picked at random. "{Fertilizer_Type}"
+# is filled in from the input row.
+N_VERY_LOW = (
+    "🌱 Nitrogen very low: Apply 25–30 kg/ha urea immediately.",
+    "🌱 Severe nitrogen deficiency detected — add 25–30 kg/ha urea soon.",
+    "🌱 Nitrogen levels are critically low, urgent urea application recommended.",
+)
+
+N_LOW = (
+    "🌱 Nitrogen low: Apply nitrogen-rich fertilizer like urea.",
+    "🌱 Mild nitrogen shortage. Consider using urea or ammonium sulfate.",
+    "🌱 Nitrogen is slightly low — boost with nitrogen fertilizer.",
+)
+
+N_OK = (
+    "🌱 Nitrogen levels are sufficient.",
+    "🌱 Adequate nitrogen detected, no immediate action needed.",
+    "🌱 Nitrogen supply is optimal — maintain current fertilization.",
+)
+
+P_VERY_LOW = (
+    "🌿 Phosphorus very low: Apply 30–40 kg/ha DAP.",
+    "🌿 Severe phosphorus deficiency — provide DAP urgently.",
+    "🌿 Very low phosphorus detected. Apply 30–40 kg/ha phosphate fertilizer.",
+)
+
+P_LOW = (
+    "🌿 Phosphorus low: Consider additional phosphorus fertilizer.",
+    "🌿 Mild phosphorus shortage observed. Top-up with phosphate fertilizer.",
+    "🌿 Phosphorus slightly low — apply more DAP for balance.",
+)
+
+P_OK = (
+    "🌿 Phosphorus levels are sufficient.",
+    "🌿 Adequate phosphorus detected, no action needed.",
+    "🌿 Phosphorus levels are balanced — maintain current fertilization.",
+)
+
+K_VERY_LOW = (
+    "🪴 Potassium very low: Apply 30–40 kg/ha MOP.",
+    "🪴 Severe potassium deficiency detected, add muriate of potash.",
+    "🪴 Very low potassium levels, apply MOP urgently.",
+)
+
+K_LOW = (
+    "🪴 Potassium low: Consider additional potassium fertilizer.",
+    "🪴 Mild potassium shortage — add muriate of potash (MOP).",
+    "🪴 Potassium is slightly low, top-up recommended.",
+)
+
+K_OK = (
+    "🪴 Potassium levels are sufficient.",
+    "🪴 Adequate potassium detected.",
+    "🪴 Potassium status is optimal — no adjustments required.",
+)
+
+PH_ACIDIC = (
+    "🧪 Soil is acidic. Apply lime to raise pH and improve nutrient uptake.",
+    "🧪 The soil shows acidity — consider liming to balance pH.",
+    "🧪 Acidic soil detected. Add lime to improve nutrient absorption.",
+)
+
+PH_ALKALINE = (
+    "🧪 Soil is alkaline. Add organic matter or gypsum to improve pH.",
+    "🧪 High alkalinity detected — gypsum application recommended.",
+    "🧪 Alkaline soil present. Use organic matter to rebalance pH.",
+)
+
+PH_OK = (
+    "🧪 Soil pH is optimal.",
+    "🧪 Balanced soil pH detected.",
+    "🧪 Soil pH is within the healthy range.",
+)
+
+RAIN_LOW = (
+    "💧 Low rainfall detected. Irrigation is necessary.",
+    "💧 Very little rainfall — ensure supplementary irrigation.",
+    "💧 Insufficient rainfall, arrange irrigation support.",
+)
+
+RAIN_HIGH = (
+    "💧 High rainfall. Ensure proper drainage to avoid waterlogging.",
+    "💧 Excess rainfall observed — maintain good field drainage.",
+    "💧 Heavy rainfall detected, check for waterlogging issues.",
+)
+
+RAIN_OK = (
+    "💧 Rainfall is adequate.",
+    "💧 Rainfall levels are optimal for crop growth.",
+    "💧 Adequate rainfall — irrigation adjustments not needed.",
+)
+
+TEMP_HIGH = (
+    "☀️ High temperature: Use mulching/shading or plant heat-tolerant varieties.",
+    "☀️ Extreme heat detected — provide shade or mulch for crops.",
+    "☀️ High temperatures can stress crops, consider heat-tolerant seeds.",
+)
+
+TEMP_LOW = (
+    "❄️ Low temperature: Protect crops from frost if applicable.",
+    "❄️ Very cold conditions detected — cover young plants if possible.",
+    "❄️ Low temperatures may harm crops — take protective measures.",
+)
+
+TEMP_OK = (
+    "🌡️ Temperature is within optimal range.",
+    "🌡️ Temperature levels are suitable for growth.",
+    "🌡️ Current temperature is favorable for crops.",
+)
+
+HUMIDITY_HIGH = (
+    "💦 High humidity: Monitor for fungal diseases and apply fungicides proactively.",
+    "💦 Excess humidity may trigger fungal infections — take preventive steps.",
+    "💦 Very humid conditions detected, keep watch for fungal outbreaks.",
+)
+
+HUMIDITY_LOW = (
+    "💦 Low humidity: Use drip irrigation or maintain soil moisture.",
+    "💦 Dry air detected — ensure consistent soil watering.",
+    "💦 Low humidity may dry crops, maintain irrigation.",
+)
+
+HUMIDITY_OK = (
+    "💦 Humidity is within ideal range.",
+    "💦 Balanced humidity observed.",
+    "💦 Humidity levels are favorable for crops.",
+)
+
+FERTILIZER_LOW = (
+    "🌾 Fertilizer amount is low. Consider increasing {Fertilizer_Type} fertilizer for optimal growth.",
+    "🌾 Low fertilizer detected — add more {Fertilizer_Type} for better yield.",
+    "🌾 Insufficient fertilizer applied. Increase {Fertilizer_Type} usage.",
+)
+
+PESTICIDE_LOW = (
+    "🐛 Pesticide amount is low. Regular pest monitoring is recommended.",
+    "🐛 Low pesticide use detected — ensure proper pest surveillance.",
+    "🐛 Insufficient pesticide applied. Monitor crops closely.",
+)
+
+YIELD_EXCELLENT = (
+    "📊 Overall crop health is excellent. Maintain current practices.",
+    "📊 Crops look excellent — continue with existing care.",
+    "📊 Excellent yield potential — sustain present management.",
+)
+
+YIELD_MODERATE = (
+    "📊 Overall crop health is moderate. Follow above recommendations for better yield.",
+    "📊 Crop condition is moderate — improvements possible with adjustments.",
+    "📊 Yield outlook is moderate. Apply suggested measures for improvement.",
+)
+
+YIELD_POOR = (
+    "📊 Overall crop health is poor. Immediate action required: optimize nutrients, irrigation, and pest control.",
+    "📊 Crop condition is poor — urgent corrective action needed.",
+    "📊 Very low crop health detected. Adjust fertilization, water, and pest management immediately.",
+)
+
+
+def above(threshold):
+    """Edge for a strict `value > threshold` test (bins are closed on the left)."""
+    return float(np.nextafter(threshold, np.inf))
+
+
+# ==============================
+# Threshold table
+# ==============================
+# (field, edges, messages per bin). A value v lands in bin i when
+# edges[i-1] <= v < edges[i]; a bin of None adds no recommendation.
+# Order here is the order recommendations are returned in.
+RULES = [
+    ("N", [30, 50], [N_VERY_LOW, N_LOW, N_OK]),
+    ("P", [15, 25], [P_VERY_LOW, P_LOW, P_OK]),
+    ("K", [20, 35], [K_VERY_LOW, K_LOW, K_OK]),
+    ("pH", [6.0, above(7.5)], [PH_ACIDIC, PH_OK, PH_ALKALINE]),
+    ("Rainfall", [200, above(800)], [RAIN_LOW, RAIN_OK, RAIN_HIGH]),
+    ("Temp", [15, above(35)], [TEMP_LOW, TEMP_OK, TEMP_HIGH]),
+    ("Humidity", [50, above(80)], [HUMIDITY_LOW, HUMIDITY_OK, HUMIDITY_HIGH]),
+    ("Fertilizer_Amount", [50], [FERTILIZER_LOW, None]),
+    ("Pesticide_Amount", [5], [PESTICIDE_LOW, None]),
+    ("predicted_yield", [above(50), above(80)], [YIELD_POOR, YIELD_MODERATE, YIELD_EXCELLENT]),
+]
+
+# Set to make message selection reproducible (same input -> same messages)
+RECOMMENDATION_SEED = os.getenv("RECOMMENDATION_SEED")
+
+
+class CompiledRule:
+    def __init__(self, field, edges, bins):
+        if len(bins) != len(edges) + 1:
+            raise ValueError(f"Rule for {field}: {len(edges)} edges need {len(edges) + 1} bins")
+        self.field = field
+        self.edges = np.asarray(edges, dtype=float)
+        self.edge_list = [float(e) for e in edges]
+        self.bins = [tuple(messages) if messages else () for messages in bins]
+        # All messages in one flat array; a bin's variants start at offsets[bin]
+        self.bin_sizes = np.array([len(b) for b in self.bins])
+        self.offsets = np.concatenate([[0], np.cumsum(self.bin_sizes)[:-1]])
+        flat = [message for b in self.bins for message in b]
+        self.flat_messages = np.empty(len(flat) + 1, dtype=object)
+        self.flat_messages[:-1] = flat
+        self.flat_messages[-1] = None   # picked for bins without messages
+        self.templated = any("{" in message for message in flat)
+
+    def bin_of(self, value):
+        return bisect.bisect_right(self.edge_list, value)
+
+
+def compile_rules(rules=RULES):
+    return [CompiledRule(field, edges, bins) for field, edges, bins in rules]
+
+
+COMPILED_RULES = compile_rules()
+
+
+def make_rng(seed=None):
+    if seed is None and RECOMMENDATION_SEED is not None:
+        seed = int(RECOMMENDATION_SEED)
+    return np.random.default_rng(seed)
+
+
+_rng = make_rng()
+
+
+def _default_rng():
+    # A seeded run restarts the sequence on every call so results repeat
+    return make_rng() if RECOMMENDATION_SEED is not None else _rng
+
+
+# Both paths draw one uniform per rule for each row, including rules whose bin
+# adds nothing, and pick variant int(draw * len(bin)); so a seeded row gets
+# the same messages from recommend_row and from recommend_batch.
+def recommend_row(values, rng=None):
+    """Recommendations for one row; `values` maps each rule field to a number."""
+    rng = rng or _default_rng()
+    draws = rng.random(len(COMPILED_RULES))
+    recommendations = []
+    for rule, draw in zip(COMPILED_RULES, draws):
+        messages = rule.bins[rule.bin_of(values[rule.field])]
+        if not messages:
+            continue
+        message = messages[int(draw * len(messages))]
+        if rule.templated:
+            message = message.format(**values)
+        recommendations.append(message)
+    return recommendations
+
+
+def recommend_batch(frame, rng=None):
+    """Recommendations for every row of a DataFrame (or dict of equal-length columns).
+
+    Binning and message selection run column-wise with NumPy; only the final
+    per-row lists are assembled in Python. With RECOMMENDATION_SEED set and no
+    rng given, every row gets the draws recommend_row would use for it alone.
+    """
+    n = len(frame[COMPILED_RULES[0].field])
+    if rng is None and RECOMMENDATION_SEED is not None:
+        draws = np.broadcast_to(make_rng().random(len(COMPILED_RULES)), (n, len(COMPILED_RULES)))
+    else:
+        draws = (rng or _rng).random((n, len(COMPILED_RULES)))
+    chosen = np.empty((len(COMPILED_RULES), n), dtype=object)
+
+    for r, rule in enumerate(COMPILED_RULES):
+        values = np.asarray(frame[rule.field], dtype=float)
+        bins = np.digitize(values, rule.edges)
+        sizes = rule.bin_sizes[bins]
+        picks = (draws[:, r] * sizes).astype(np.int64)
+        index = np.where(sizes > 0, rule.offsets[bins] + picks, len(rule.flat_messages) - 1)
+        messages = rule.flat_messages[index]
+
+        if rule.templated:
+            fertilizer = np.asarray(frame["Fertilizer_Type"], dtype=object)
+            has_message = sizes > 0
+            messages[has_message] = [
+                m.format(Fertilizer_Type=f) for m, f in zip(messages[has_message], fertilizer[has_message])
+            ]
+        chosen[r] = messages
+
+    return [[m for m in column if m is not None] for column in chosen.T]
@@ -0,0 +1,199 @@
+# score_yield.py
+# Offline bulk yield scoring: same features, model and recommendations as the
+# API, but streamed through fixed-size chunks so memory stays flat.
+#
+#   python score_yield.py plots.csv predictions.csv
+#   python score_yield.py plots.parquet predictions.parquet --chunk-size 100000 --workers 4
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from features import CATEGORICAL_COLS, FEATURE_COLUMNS, encode_features
+from model_registry import file_version
+from recommendations import recommend_batch
+
+# Used when the input has no weather columns (same fallback as the API)
+DEFAULT_WEATHER = {"Temp": 25.0, "Humidity": 60.0, "Rainfall": 500.0}
+NUMERIC_COLS = [col for col in FEATURE_COLUMNS if col not in CATEGORICAL_COLS]
+
+# Output column types that must not depend on which rows the first chunk holds
+# (an all-None "error" column would otherwise be typed null and fix the schema)
+STRING_OUTPUT_COLS = CATEGORICAL_COLS + ["recommendations", "model_version", "error"]
+FLOAT_OUTPUT_COLS = NUMERIC_COLS + list(DEFAULT_WEATHER) + ["predicted_yield_kgha", "total_production_tonnes"]
+
+_booster = None
+_model_version = None
+
+
+def init_worker(model_path):
+    global _booster, _model_version
+    _booster = xgb.Booster()
+    _booster.load_model(model_path)
+    _model_version = file_version(model_path)
+
+
+def validate_chunk(chunk):
+    """Coerce types in place and return a per-row error message (None when valid)."""
+    problems = pd.DataFrame(index=chunk.index)
+    for col in FEATURE_COLUMNS:
+        if col not in chunk.columns:
+            chunk[col] = np.nan
+        if col in NUMERIC_COLS:
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+        problems[col] = chunk[col].isna()
+
+    def describe(row):
+        bad = [col for col, is_bad in row.items() if is_bad]
+        return f"missing or invalid: {', '.join(bad)}" if bad else None
+
+    errors = pd.Series(None, index=chunk.index, dtype=object)
+    has_problem = problems.any(axis=1)
+    if has_problem.any():
+        errors[has_problem] = problems[has_problem].apply(describe, axis=1)
+    return errors
+
+
+def score_chunk(chunk, index=0, seed=None):
+    """Predictions and recommendations for one chunk of input rows."""
+    chunk = chunk.reset_index(drop=True)
+    errors = validate_chunk(chunk)
+    valid = errors.isna().to_numpy()
+
+    for field, default in DEFAULT_WEATHER.items():
+        values = pd.to_numeric(chunk[field], errors="coerce") if field in chunk.columns else np.nan
+        chunk[field] = pd.Series(values, index=chunk.index, dtype=float).fillna(default)
+
+    out = chunk.copy()
+    out["predicted_yield_kgha"] = np.nan
+    out["total_production_tonnes"] = np.nan
+    out["recommendations"] = None
+    out["model_version"] = _model_version
+    out["error"] = errors
+
+    if valid.any():
+        rows = chunk[valid]
+        predictions = _booster.predict(xgb.DMatrix(encode_features(rows)))
+        scored = rows.assign(predicted_yield=predictions)
+        rng = np.random.default_rng([seed, index]) if seed is not None else None
+        recommendations = recommend_batch(scored, rng=rng)
+
+        out.loc[valid, "predicted_yield_kgha"] = predictions
+        out.loc[valid, "total_production_tonnes"] = predictions * rows["area"].to_numpy() / 1000
+        out.loc[valid, "recommendations"] = [" | ".join(r) for r in recommendations]
+    return out
+
+
+def read_chunks(path, chunk_size):
+    if path.lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file as they arrive."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.lower().endswith((".parquet", ".pq"))
+        self._writer = None
+        self._first = True
+
+    @staticmethod
+    def parquet_schema(frame):
+        """Fixed types for the scoring columns; other input columns keep their inferred type."""
+        import pyarrow as pa
+
+        inferred = pa.Schema.from_pandas(frame, preserve_index=False)
+        fields = []
+        for field in inferred:
+            if field.name in STRING_OUTPUT_COLS:
+                fields.append(pa.field(field.name, pa.string()))
+            elif field.name in FLOAT_OUTPUT_COLS:
+                fields.append(pa.field(field.name, pa.float64()))
+            elif pa.types.is_null(field.type):
+                fields.append(pa.field(field.name, pa.string()))
+            else:
+                fields.append(field)
+        return pa.schema(fields)
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, self.parquet_schema(frame))
+            schema = self._writer.schema
+            self._writer.write_table(pa.Table.from_pandas(frame[schema.names], schema=schema, preserve_index=False))
+        else:
+            frame.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score_file(input_path, output_path, model_path, chunk_size=50000, workers=1, seed=None):
+    writer = ChunkWriter(output_path)
+    rows = 0
+    failed = 0
+    start = time.perf_counter()
+
+    def record(frame):
+        nonlocal rows, failed
+        writer.write(frame)
+        rows += len(frame)
+        failed += int(frame["error"].notna().sum())
+        print(f"  {rows} rows scored ({failed} failed)", file=sys.stderr)
+
+    try:
+        chunks = read_chunks(input_path, chunk_size)
+        if workers <= 1:
+            init_worker(model_path)
+            for i, chunk in enumerate(chunks):
+                record(score_chunk(chunk, i, seed))
+        else:
+            # At most 2 chunks per worker in flight keeps memory bounded;
+            # results are written back in input order.
+            with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(model_path,)) as pool:
+                pending = []
+                for i, chunk in enumerate(chunks):
+                    pending.append(pool.submit(score_chunk, chunk, i, seed))
+                    if len(pending) >= 2 * workers:
+                        record(pending.pop(0).result())
+                for future in pending:
+                    record(future.result())
+    finally:
+        writer.close()
+
+    return {"rows": rows, "failed": failed, "seconds": round(time.perf_counter() - start, 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file of plots with the yield model")
+    parser.add_argument("input", help="CSV or Parquet file with YieldInput columns")
+    parser.add_argument("output", help="CSV or Parquet file to write (format from extension)")
+    parser.add_argument("--model", default=os.getenv("MODEL_PATH", "crop_yield_model.json"))
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=1, help="processes used to score chunks")
+    parser.add_argument("--seed", type=int, default=None, help="make recommendation texts reproducible")
+    args = parser.parse_args(argv)
+
+    summary = score_file(args.input, args.output, args.model, args.chunk_size, args.workers, args.seed)
+    print(f"Scored {summary['rows']} rows ({summary['failed']} failed) in {summary['seconds']} s "
+          f"-> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
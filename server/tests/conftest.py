@@ -0,0 +1,16 @@
+# tests/conftest.py
+import os
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+# Offline settings; must be in place before server modules are imported
+os.environ.setdefault("CATEGORY_VOCAB_PATH", os.path.join(SERVER_DIR, "crop_yield_vocab.json"))
+os.environ.setdefault("MODEL_PATH", os.path.join(SERVER_DIR, "crop_yield_model.json"))
+os.environ.setdefault("DB_NAME", "test")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("OPENWEATHER_KEY", "")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("AUDIT_LOG_ENABLED", "0")
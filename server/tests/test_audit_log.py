@@ -0,0 +1,154 @@
+# tests/test_audit_log.py
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from database import AuditLog
+
+
+@pytest.fixture
+def collection():
+    return AsyncMongoMockClient()["test"]["prediction_audit"]
+
+
+class GatedCollection:
+    """Wraps a collection so insert_many waits until the test opens the gate."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.gate = asyncio.Event()
+        self.inserts_started = 0
+
+    async def insert_many(self, documents, ordered=True):
+        self.inserts_started += 1
+        await self.gate.wait()
+        return await self.collection.insert_many(documents, ordered=ordered)
+
+
+async def stored(collection):
+    return sorted(doc["n"] for doc in await collection.find({}).to_list(None))
+
+
+def docs(*numbers):
+    return [{"n": n} for n in numbers]
+
+
+def test_drop_oldest_keeps_the_newest_records(collection):
+    async def main():
+        log = AuditLog(collection, batch_size=2, max_pending=3, overflow="drop_oldest")
+        accepted = [await log.record(doc) for doc in docs(0, 1, 2, 3, 4)]
+        await log.flush()
+        return log, accepted, await stored(collection)
+
+    log, accepted, written = asyncio.run(main())
+    assert accepted == [True] * 5
+    assert written == [2, 3, 4]
+    assert (log.recorded, log.dropped, log.written) == (5, 2, 3)
+
+
+def test_drop_newest_refuses_records_while_full(collection):
+    async def main():
+        log = AuditLog(collection, batch_size=2, max_pending=3, overflow="drop_newest")
+        accepted = [await log.record(doc) for doc in docs(0, 1, 2, 3, 4)]
+        await log.flush()
+        return log, accepted, await stored(collection)
+
+    log, accepted, written = asyncio.run(main())
+    assert accepted == [True, True, True, False, False]
+    assert written == [0, 1, 2]
+    assert (log.recorded, log.dropped) == (3, 2)
+
+
+def test_block_waits_for_the_flusher_to_make_room(collection):
+    async def main():
+        log = AuditLog(collection, batch_size=2, flush_interval=60, max_pending=2, overflow="block",
+                       block_timeout=5)
+        log.start()
+        accepted = [await log.record(doc) for doc in docs(0, 1, 2, 3, 4)]
+        await log.stop()
+        return log, accepted, await stored(collection)
+
+    log, accepted, written = asyncio.run(main())
+    assert accepted == [True] * 5
+    assert written == [0, 1, 2, 3, 4]
+    assert log.dropped == 0
+
+
+def test_block_drops_after_timeout_when_no_room_is_made(collection):
+    gated = GatedCollection(collection)
+
+    async def main():
+        log = AuditLog(gated, batch_size=2, flush_interval=60, max_pending=2, overflow="block",
+                       block_timeout=0.05)
+        log.start()
+        # The flusher takes 0 and 1, then hangs in insert_many
+        for doc in docs(0, 1):
+            await log.record(doc)
+        while not gated.inserts_started:
+            await asyncio.sleep(0)
+        filled = [await log.record(doc) for doc in docs(2, 3)]
+        refused = await log.record({"n": 4})
+
+        gated.gate.set()
+        await log.stop()
+        return log, filled, refused, await stored(collection)
+
+    log, filled, refused, written = asyncio.run(main())
+    assert filled == [True, True]
+    assert refused is False
+    assert written == [0, 1, 2, 3]
+    assert log.dropped == 1
+
+
+def test_block_without_a_flusher_drops_immediately(collection):
+    async def main():
+        log = AuditLog(collection, batch_size=1, max_pending=1, overflow="block", block_timeout=5)
+        return [await log.record(doc) for doc in docs(0, 1)]
+
+    assert asyncio.run(main()) == [True, False]
+
+
+def test_stop_flushes_everything_still_buffered(collection):
+    async def main():
+        log = AuditLog(collection, batch_size=100, flush_interval=60)
+        log.start()
+        for doc in docs(*range(50)):
+            await log.record(doc)
+        # Below batch_size and long before the interval, so only stop() writes these
+        await asyncio.sleep(0)
+        assert log.written == 0
+        await log.stop()
+        return log, await stored(collection)
+
+    log, written = asyncio.run(main())
+    assert written == list(range(50))
+    assert log.stats()["pending"] == 0 and log.stats()["running"] is False
+
+
+def test_stop_right_after_start_still_flushes(collection):
+    async def main():
+        log = AuditLog(collection, flush_interval=60)
+        log.start()
+        await log.record({"n": 0})
+        await log.stop()
+        return await stored(collection)
+
+    assert asyncio.run(main()) == [0]
+
+
+def test_failed_writes_are_counted_not_retried(collection):
+    class Broken:
+        async def insert_many(self, documents, ordered=True):
+            raise ConnectionError("mongo down")
+
+    async def main():
+        log = AuditLog(Broken(), batch_size=2)
+        for doc in docs(0, 1, 2):
+            await log.record(doc)
+        await log.flush()
+        return log
+
+    log = asyncio.run(main())
+    assert (log.failed, log.written, log.batches) == (3, 0, 2)
+    assert log.stats()["pending"] == 0
@@ -0,0 +1,114 @@
+# tests/test_auth.py
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import auth
+from auth import TokenService
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Only the cache's clock moves; signature and exp checks in jose use the real time
+    clock = Clock(auth.time.time())
+    monkeypatch.setattr(auth, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+def counting_decodes(service, monkeypatch):
+    calls = []
+    decode = service.decode
+
+    def counted(token):
+        calls.append(token)
+        return decode(token)
+    monkeypatch.setattr(service, "decode", counted)
+    return calls
+
+
+def test_cached_claims_are_reused_only_for_the_ttl(clock, monkeypatch):
+    service = TokenService(secret_key="test-secret", cache_ttl=60)
+    token = service.create_access_token({"sub": "farmer@example.com"}, timedelta(hours=1))
+    decodes = counting_decodes(service, monkeypatch)
+
+    assert service.verify_token(token)["sub"] == "farmer@example.com"
+    clock.now += 59
+    assert service.verify_token(token)["sub"] == "farmer@example.com"
+    assert len(decodes) == 1
+
+    clock.now += 2
+    assert service.verify_token(token)["sub"] == "farmer@example.com"
+    assert len(decodes) == 2 and service.expired == 1
+
+
+def test_cached_claims_are_not_reused_past_exp(clock, monkeypatch):
+    service = TokenService(secret_key="test-secret", cache_ttl=3600)
+    token = service.create_access_token({"sub": "farmer@example.com"}, timedelta(seconds=30))
+    decodes = counting_decodes(service, monkeypatch)
+
+    service.verify_token(token)
+    clock.now += 29
+    service.verify_token(token)
+    assert len(decodes) == 1
+
+    # Past exp the entry is stale even though the cache TTL has not run out
+    clock.now += 2
+    service.verify_token(token)
+    assert len(decodes) == 2 and service.expired == 1
+
+
+def test_expired_and_forged_tokens_are_rejected_and_not_cached():
+    service = TokenService(secret_key="test-secret", cache_ttl=60)
+    expired = service.create_access_token({"sub": "a"}, timedelta(seconds=-1))
+    forged = TokenService(secret_key="other-secret").create_access_token({"sub": "a"})
+
+    assert service.verify_token(expired) is None
+    assert service.verify_token(forged) is None
+    assert service.stats()["size"] == 0
+
+
+def test_cached_claims_cannot_be_modified_by_callers():
+    service = TokenService(secret_key="test-secret", cache_ttl=60)
+    token = service.create_access_token({"sub": "a"})
+    service.verify_token(token)["sub"] = "mallory"
+    assert service.verify_token(token)["sub"] == "a"
+
+
+def rsa_pair():
+    rsa = pytest.importorskip("rsa")
+    public, private = rsa.newkeys(1024)
+    return private.save_pkcs1().decode(), public.save_pkcs1().decode()
+
+
+def ec_pair():
+    ecdsa = pytest.importorskip("ecdsa")
+    private = ecdsa.SigningKey.generate(curve=ecdsa.NIST256p)
+    return private.to_pem().decode(), private.get_verifying_key().to_pem().decode()
+
+
+@pytest.mark.parametrize("algorithm,make_pair", [("RS256", rsa_pair), ("ES256", ec_pair)])
+def test_asymmetric_tokens_verify_with_the_public_key(algorithm, make_pair):
+    private_pem, public_pem = make_pair()
+    signer = TokenService(algorithm=algorithm, private_key=private_pem)
+    verifier = TokenService(algorithm=algorithm, public_key=public_pem)
+    token = signer.create_access_token({"sub": "farmer@example.com"})
+
+    assert verifier.verify_token(token)["sub"] == "farmer@example.com"
+    # The signer derives its own verification key from the private key
+    assert signer.verify_token(token)["sub"] == "farmer@example.com"
+
+    other_private, _ = make_pair()
+    forged = TokenService(algorithm=algorithm, private_key=other_private).create_access_token({"sub": "x"})
+    assert verifier.verify_token(forged) is None
+
+    with pytest.raises(RuntimeError):
+        verifier.create_access_token({"sub": "x"})
@@ -0,0 +1,97 @@
+# tests/test_batch_predict.py
+import asyncio
+import io
+
+import httpx
+import pandas as pd
+import pytest
+
+import app as server
+from database import AuditLog
+
+ROW = {
+    "Crop": "Rice", "State": "Punjab", "Year": 2024, "N": 40.0, "P": 20.0, "K": 30.0, "pH": 6.5,
+    "soil_type": "Loamy", "Fertilizer_Type": "Organic", "Fertilizer_Amount": 40.0,
+    "Pesticide_Amount": 3.0, "sowing_date": "2024-06-01", "area": 2.0,
+}
+
+
+@pytest.fixture(autouse=True)
+def offline_weather(monkeypatch):
+    async def fallback(state):
+        return dict(server.WEATHER_FALLBACK)
+    monkeypatch.setattr(server, "fetch_weather", fallback)
+
+
+def call(method, url, **kwargs):
+    async def send():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+    return asyncio.run(send())
+
+
+def test_invalid_rows_fail_individually():
+    records = [ROW, dict(ROW, N="not a number"), {"Crop": "Rice"}, dict(ROW, N=55.0)]
+    response = call("POST", "/predict_yield/batch", json=records)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["count"], body["succeeded"], body["failed"]) == (4, 2, 2)
+    results = body["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert "error" in results[1] and "N" in results[1]["error"]
+    assert "error" in results[2] and "State" in results[2]["error"]
+    assert "error" not in results[0] and "error" not in results[3]
+
+
+def test_csv_missing_cell_is_a_row_error():
+    frame = pd.DataFrame([ROW, ROW])
+    frame.loc[1, "pH"] = None
+    files = {"file": ("plots.csv", frame.to_csv(index=False).encode(), "text/csv")}
+    response = call("POST", "/predict_yield/batch", files=files)
+
+    assert response.status_code == 200
+    assert response.json()["failed"] == 1
+    assert "pH" in response.json()["results"][1]["error"]
+
+
+def test_too_many_rows_is_413(monkeypatch):
+    monkeypatch.setattr(server, "MAX_BATCH_ROWS", 3)
+    response = call("POST", "/predict_yield/batch", json=[ROW] * 4)
+    assert response.status_code == 413
+    assert call("POST", "/predict_yield/batch", json=[ROW] * 3).status_code == 200
+
+
+@pytest.mark.parametrize("as_upload", [False, True], ids=["json-body", "csv-upload"])
+def test_too_many_bytes_is_413(monkeypatch, as_upload):
+    monkeypatch.setattr(server, "MAX_BATCH_FILE_BYTES", 1024)
+    frame = pd.DataFrame([ROW] * 50)
+    if as_upload:
+        response = call("POST", "/predict_yield/batch",
+                        files={"file": ("plots.csv", frame.to_csv(index=False).encode(), "text/csv")})
+    else:
+        response = call("POST", "/predict_yield/batch", json=frame.to_dict(orient="records"))
+    assert response.status_code == 413
+
+
+def test_parquet_upload():
+    buffer = io.BytesIO()
+    pd.DataFrame([ROW, dict(ROW, State="Kerala")]).to_parquet(buffer)
+    files = {"file": ("plots.parquet", buffer.getvalue(), "application/octet-stream")}
+    response = call("POST", "/predict_yield/batch", files=files)
+
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == 2
+
+
+def test_each_scored_row_is_audited(monkeypatch):
+    log = AuditLog(collection=None, enabled=True)
+    monkeypatch.setattr(server, "audit_log", log)
+    response = call("POST", "/predict_yield/batch", json=[ROW, dict(ROW, N="bad"), dict(ROW, N=55.0)])
+
+    assert response.status_code == 200
+    pending = list(log._pending)
+    assert [doc["route"] for doc in pending] == ["/predict_yield/batch"] * 2
+    assert [doc["input"]["N"] for doc in pending] == [40.0, 55.0]
+    assert pending[1]["result"] == {k: v for k, v in response.json()["results"][2].items() if k != "index"}
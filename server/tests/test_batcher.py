@@ -0,0 +1,43 @@
+# tests/test_batcher.py
+import asyncio
+
+import numpy as np
+
+from batcher import MicroBatcher
+
+
+def test_rows_are_scored_with_the_context_they_were_submitted_with():
+    calls = []
+
+    def predict(matrix, context):
+        calls.append((context, matrix.shape))
+        return [f"{context}:{row[0]:.0f}" for row in matrix]
+
+    batcher = MicroBatcher(predict, window_ms=50, max_batch_size=64)
+
+    async def main():
+        # A reload mid-window: later rows are encoded for a model with more features
+        old = [batcher.submit(np.full(28, i), "v1") for i in range(3)]
+        new = [batcher.submit(np.full(30, i), "v2") for i in range(3, 5)]
+        return await asyncio.gather(*old, *new)
+
+    assert asyncio.run(main()) == ["v1:0", "v1:1", "v1:2", "v2:3", "v2:4"]
+    assert calls == [("v1", (3, 28)), ("v2", (2, 30))]
+    assert batcher.batches == 2 and batcher.rows == 5
+
+
+def test_failure_only_affects_its_group():
+    def predict(matrix, context):
+        if context == "broken":
+            raise ValueError("feature shape mismatch")
+        return [float(row[0]) for row in matrix]
+
+    batcher = MicroBatcher(predict, window_ms=50)
+
+    async def main():
+        return await asyncio.gather(batcher.submit(np.ones(4), "ok"), batcher.submit(np.ones(4), "broken"),
+                                    return_exceptions=True)
+
+    ok, broken = asyncio.run(main())
+    assert ok == 1.0
+    assert isinstance(broken, ValueError)
@@ -0,0 +1,175 @@
+# tests/test_cache.py
+import asyncio
+
+import pytest
+
+import cache
+from cache import AsyncTTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+class Source:
+    """fetch() stand-in that counts calls and can be held open."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = None
+
+    async def fetch(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        return f"value-{self.calls}"
+
+
+def test_concurrent_misses_share_one_fetch(clock):
+    ttl_cache = AsyncTTLCache(ttl=10)
+    source = Source()
+
+    async def main():
+        source.release = asyncio.Event()
+        waiters = [asyncio.ensure_future(ttl_cache.get_or_fetch("k", source.fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        source.release.set()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(main()) == ["value-1"] * 5
+    assert source.calls == 1
+    assert ttl_cache.misses == 5 and ttl_cache.coalesced == 4
+    assert ttl_cache.stats()["inflight"] == 0
+
+
+def test_failed_fetch_reaches_every_waiter_and_is_not_cached(clock):
+    ttl_cache = AsyncTTLCache(ttl=10)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(ttl_cache.get_or_fetch("k", failing) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(calls) == 1 and ttl_cache.load_errors == 1
+    assert ttl_cache.stats()["size"] == 0
+
+
+def test_entry_expires_after_ttl(clock):
+    ttl_cache = AsyncTTLCache(ttl=10)
+    source = Source()
+
+    async def main():
+        first = await ttl_cache.get_or_fetch("k", source.fetch)
+        clock.now += 9.9
+        cached = await ttl_cache.get_or_fetch("k", source.fetch)
+        clock.now += 0.1
+        refetched = await ttl_cache.get_or_fetch("k", source.fetch)
+        return first, cached, refetched
+
+    assert asyncio.run(main()) == ("value-1", "value-1", "value-2")
+    assert (ttl_cache.hits, ttl_cache.misses) == (1, 2)
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(clock):
+    ttl_cache = AsyncTTLCache(ttl=10, stale_ttl=30)
+    source = Source()
+
+    async def main():
+        await ttl_cache.get_or_fetch("k", source.fetch)
+        clock.now += 15
+        source.release = asyncio.Event()
+        stale = [await ttl_cache.get_or_fetch("k", source.fetch) for _ in range(3)]
+        assert ttl_cache.stats()["inflight"] == 1
+        source.release.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        fresh = await ttl_cache.get_or_fetch("k", source.fetch)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(main())
+    assert stale == ["value-1"] * 3
+    assert fresh == "value-2"
+    assert source.calls == 2
+    assert (ttl_cache.stale_hits, ttl_cache.coalesced, ttl_cache.hits) == (3, 2, 1)
+
+
+def test_entry_past_stale_window_is_a_miss(clock):
+    ttl_cache = AsyncTTLCache(ttl=10, stale_ttl=30)
+    source = Source()
+
+    async def main():
+        await ttl_cache.get_or_fetch("k", source.fetch)
+        clock.now += 40
+        return await ttl_cache.get_or_fetch("k", source.fetch)
+
+    assert asyncio.run(main()) == "value-2"
+    assert ttl_cache.stale_hits == 0 and ttl_cache.misses == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_fetch(clock):
+    ttl_cache = AsyncTTLCache(ttl=10)
+    source = Source()
+
+    async def main():
+        source.release = asyncio.Event()
+        cancelled = asyncio.ensure_future(ttl_cache.get_or_fetch("k", source.fetch))
+        survivor = asyncio.ensure_future(ttl_cache.get_or_fetch("k", source.fetch))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        source.release.set()
+        value = await survivor
+        return cancelled.cancelled(), value
+
+    assert asyncio.run(main()) == (True, "value-1")
+    assert source.calls == 1
+    assert ttl_cache.stats()["size"] == 1
+
+
+def test_fetch_completes_and_is_cached_when_only_caller_is_cancelled(clock):
+    ttl_cache = AsyncTTLCache(ttl=10)
+    source = Source()
+
+    async def main():
+        source.release = asyncio.Event()
+        caller = asyncio.ensure_future(ttl_cache.get_or_fetch("k", source.fetch))
+        await asyncio.sleep(0)
+        caller.cancel()
+        source.release.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        return await ttl_cache.get_or_fetch("k", source.fetch)
+
+    assert asyncio.run(main()) == "value-1"
+    assert source.calls == 1 and ttl_cache.hits == 1
+
+
+def test_lru_eviction(clock):
+    ttl_cache = AsyncTTLCache(ttl=10, maxsize=2)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.set("c", 3)
+    assert ttl_cache.stats()["size"] == 2 and ttl_cache.evictions == 1
+
+    async def main():
+        return await ttl_cache.get_or_fetch("a", Source().fetch)
+
+    assert asyncio.run(main()) == "value-1"
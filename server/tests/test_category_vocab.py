@@ -0,0 +1,41 @@
+# tests/test_category_vocab.py
+# The frozen vocabulary must list exactly the values the client offers,
+# sorted the way pandas orders category codes.
+import json
+import os
+import re
+
+import pandas as pd
+import pytest
+
+import features
+
+CLIENT_FORM = os.path.join(os.path.dirname(__file__), "..", "..", "client", "src", "components", "InputData.jsx")
+CLIENT_LISTS = {"Crop": "validCrops", "State": "validStates", "soil_type": "validSoilTypes",
+                "Fertilizer_Type": "validFertilizerTypes"}
+
+
+def client_options(name):
+    with open(CLIENT_FORM, encoding="utf-8") as f:
+        source = f.read()
+    body = re.search(r"const %s = \[(.*?)\];" % name, source, re.S).group(1)
+    return re.findall(r'"([^"]+)"', body)
+
+
+@pytest.fixture(scope="module")
+def vocab():
+    with open(os.environ["CATEGORY_VOCAB_PATH"], encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.skipif(not os.path.exists(CLIENT_FORM), reason="client sources not checked out")
+@pytest.mark.parametrize("column", features.CATEGORICAL_COLS)
+def test_vocab_matches_client_options(vocab, column):
+    assert sorted(client_options(CLIENT_LISTS[column])) == vocab[column]
+
+
+@pytest.mark.parametrize("column", features.CATEGORICAL_COLS)
+def test_codes_match_pandas_category_codes(vocab, column):
+    values = pd.Series(vocab[column])
+    expected = dict(zip(values, values.astype("category").cat.codes))
+    assert features.CATEGORY_VOCAB[column] == expected
@@ -0,0 +1,53 @@
+# tests/test_color_classifier.py
+# The fused LUT classifier must count exactly what the per-class inRange masks count.
+import itertools
+
+import numpy as np
+import pytest
+
+from image_analysis import COLOR_CLASSES, count_color_classes_lut, count_color_classes_masks
+
+
+def random_hsv(shape, seed):
+    # Hue is drawn over the full byte range, including values above OpenCV's 0-180
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, shape + (3,), dtype=np.uint8)
+
+
+def edge_values(channel):
+    """Every class bound on one channel, one step either side, and the byte limits."""
+    values = {0, 255}
+    for _, lower, upper in COLOR_CLASSES:
+        for bound in (lower[channel], upper[channel]):
+            values.update(v for v in (bound - 1, bound, bound + 1) if 0 <= v <= 255)
+    return sorted(values)
+
+
+@pytest.mark.parametrize("shape,seed", [((64, 64), 0), ((257, 131), 1), ((1, 1), 2), ((1024, 768), 3)])
+def test_random_images(shape, seed):
+    hsv = random_hsv(shape, seed)
+    assert count_color_classes_lut(hsv) == count_color_classes_masks(hsv)
+
+
+def test_class_boundary_colours():
+    # One pixel per combination of per-channel edge values
+    pixels = np.array(list(itertools.product(*(edge_values(c) for c in range(3)))), dtype=np.uint8)
+    hsv = pixels.reshape(1, -1, 3)
+    assert count_color_classes_lut(hsv) == count_color_classes_masks(hsv)
+    # Each pixel individually, so a miscount can't be hidden by an offsetting one
+    lut = [count_color_classes_lut(pixel.reshape(1, 1, 3)) for pixel in pixels]
+    masks = [count_color_classes_masks(pixel.reshape(1, 1, 3)) for pixel in pixels]
+    assert lut == masks
+
+
+def test_every_colour():
+    h, s, v = np.meshgrid(np.arange(256, dtype=np.uint8), np.arange(256, dtype=np.uint8),
+                          np.arange(256, dtype=np.uint8), indexing="ij")
+    hsv = np.dstack([h.reshape(4096, 4096), s.reshape(4096, 4096), v.reshape(4096, 4096)])
+    assert count_color_classes_lut(hsv) == count_color_classes_masks(hsv)
+
+
+@pytest.mark.parametrize("value", [0, 255])
+def test_uniform_images(value):
+    hsv = np.full((32, 48, 3), value, dtype=np.uint8)
+    assert count_color_classes_lut(hsv) == count_color_classes_masks(hsv)
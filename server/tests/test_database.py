@@ -0,0 +1,85 @@
+# tests/test_database.py
+# Runs against mongomock-motor, an in-memory stand-in for MongoDB.
+import asyncio
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import app as server
+import database
+
+
+@pytest.fixture
+def users(monkeypatch):
+    collection = AsyncMongoMockClient()["test"]["users"]
+    monkeypatch.setattr(database, "users_collection", collection)
+    monkeypatch.setattr(server, "users_collection", collection)
+    server.invalidate_cached_user()
+    return collection
+
+
+def call(method, url, **kwargs):
+    async def send():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+    return asyncio.run(send())
+
+
+SIGNUP = {"username": "farmer", "email": "farmer@example.com", "password": "correct horse"}
+
+
+def test_ensure_indexes_creates_unique_email_index(users):
+    asyncio.run(database.ensure_indexes())
+    indexes = asyncio.run(users.index_information())
+    assert indexes["email_unique"]["key"] == [("email", 1)]
+    assert indexes["email_unique"]["unique"] is True
+
+
+def test_second_signup_with_same_email_is_rejected(users):
+    asyncio.run(database.ensure_indexes())
+    assert call("POST", "/signup", json=SIGNUP).status_code == 200
+    response = call("POST", "/signup", json=SIGNUP)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+
+def test_concurrent_signup_duplicate_key_maps_to_400(users, monkeypatch):
+    # Both requests pass the find_one check; the unique index rejects the second insert
+    asyncio.run(database.ensure_indexes())
+    asyncio.run(users.insert_one({"username": "other", "email": SIGNUP["email"], "password": "x"}))
+
+    async def not_found(*args, **kwargs):
+        return None
+    monkeypatch.setattr(users, "find_one", not_found)
+
+    response = call("POST", "/signup", json=SIGNUP)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+    assert asyncio.run(users.count_documents({"email": SIGNUP["email"]})) == 1
+
+
+class PingDatabase:
+    def __init__(self, error=None):
+        self.error = error
+
+    async def command(self, name):
+        assert name == "ping"
+        if self.error is not None:
+            raise self.error
+        return {"ok": 1.0}
+
+
+def test_readiness_is_503_when_ping_fails(monkeypatch):
+    monkeypatch.setattr(database, "db", PingDatabase(ConnectionError("no mongod")))
+    response = call("GET", "/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+
+
+def test_readiness_is_200_when_ping_succeeds(monkeypatch):
+    monkeypatch.setattr(database, "db", PingDatabase())
+    response = call("GET", "/health/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "database": "ok"}
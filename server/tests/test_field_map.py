@@ -0,0 +1,68 @@
+# tests/test_field_map.py
+import asyncio
+import io
+import threading
+
+import cv2
+import httpx
+import numpy as np
+
+import app as server
+import image_analysis
+
+
+def call(method, url, **kwargs):
+    async def send():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+    return asyncio.run(send())
+
+
+def field_image(width=300, height=200, ext=".bmp"):
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    image[:, : width // 2] = (40, 160, 40)    # green half (BGR)
+    image[:, width // 2:] = (40, 200, 220)    # yellow half
+    ok, encoded = cv2.imencode(ext, image)
+    assert ok
+    return encoded.tobytes()
+
+
+def test_field_map_tiles_an_uploaded_image():
+    files = {"file": ("field.bmp", field_image(), "image/bmp")}
+    response = call("POST", "/analyze_crop_image/field_map", params={"tile_size": 100}, files=files)
+
+    assert response.status_code == 200
+    result = response.json()["result"]
+    assert (result["rows"], result["cols"], result["memory_mapped"]) == (2, 3, True)
+    assert result["grid"]["green"][0][0] == 100.0
+    assert result["grid"]["yellow"][1][2] == 100.0
+
+
+def test_field_map_over_size_limit_is_413(monkeypatch):
+    monkeypatch.setattr(server, "MAX_FIELD_IMAGE_BYTES", 1024)
+    files = {"file": ("field.bmp", field_image(), "image/bmp")}
+    assert call("POST", "/analyze_crop_image/field_map", files=files).status_code == 413
+
+
+def test_concurrent_jobs_share_one_tile_pool(monkeypatch):
+    pool = image_analysis.tile_pool()
+    data = field_image(640, 640, ".png")
+    seen = set()
+    classify = image_analysis.count_color_classes
+
+    def recording(hsv, method=None):
+        seen.add(threading.current_thread().name)
+        return classify(hsv, method)
+
+    monkeypatch.setattr(image_analysis, "count_color_classes", recording)
+    jobs = [threading.Thread(target=image_analysis.analyze_field_tiles, args=(data, "Wheat", 64))
+            for _ in range(4)]
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join()
+
+    assert image_analysis.tile_pool() is pool
+    assert seen and all(name.startswith("field-tiles") for name in seen)
+    assert len(seen) <= image_analysis.FIELD_TILE_WORKERS
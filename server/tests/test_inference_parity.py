@@ -0,0 +1,67 @@
+# tests/test_inference_parity.py
+# The lean /predict_yield path (float32 row + inplace_predict) must score
+# exactly like the DataFrame -> DMatrix path the model was validated with.
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from features import CATEGORICAL_COLS, CATEGORY_VOCAB, FEATURE_COLUMNS, build_feature_row, encode_features
+
+
+@pytest.fixture(scope="module")
+def booster():
+    model = xgb.Booster()
+    model.load_model(os.environ["MODEL_PATH"])
+    return model
+
+
+def random_rows(count, seed=0, unknown_share=0.2):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(count):
+        row = {
+            "Year": int(rng.integers(1995, 2030)),
+            "N": float(rng.uniform(0, 150)),
+            "P": float(rng.uniform(0, 100)),
+            "K": float(rng.uniform(0, 100)),
+            "pH": float(rng.uniform(4, 9)),
+            "Fertilizer_Amount": float(rng.uniform(0, 500)),
+            "Pesticide_Amount": float(rng.uniform(0, 50)),
+            "area": float(rng.uniform(0.1, 100)),
+        }
+        for col in CATEGORICAL_COLS:
+            if rng.random() < unknown_share:
+                row[col] = f"Unknown {col} {i}"
+            else:
+                row[col] = str(rng.choice(sorted(CATEGORY_VOCAB[col])))
+        rows.append(row)
+    return rows
+
+
+def lean_predictions(booster, rows):
+    n_features = booster.num_features()
+    return np.array([booster.inplace_predict(build_feature_row(row, n_features))[0] for row in rows])
+
+
+def dmatrix_predictions(booster, rows):
+    return booster.predict(xgb.DMatrix(encode_features(pd.DataFrame(rows))))
+
+
+def test_lean_path_matches_dmatrix_path(booster):
+    rows = random_rows(2000)
+    np.testing.assert_array_equal(lean_predictions(booster, rows), dmatrix_predictions(booster, rows))
+
+
+def test_unknown_categories_match(booster):
+    rows = random_rows(200, seed=1, unknown_share=1.0)
+    assert all(row[col].startswith("Unknown") for row in rows for col in CATEGORICAL_COLS)
+    np.testing.assert_array_equal(lean_predictions(booster, rows), dmatrix_predictions(booster, rows))
+
+
+def test_row_buffer_is_padded_with_missing(booster):
+    row = build_feature_row(random_rows(1)[0], booster.num_features())
+    assert row.shape == (1, booster.num_features())
+    assert np.isnan(row[0, len(FEATURE_COLUMNS):]).all()
@@ -0,0 +1,77 @@
+# tests/test_model_path.py
+import asyncio
+import os
+import shutil
+
+import pytest
+
+import app as server
+from model_registry import convert_model
+
+
+def set_mtime(path, seconds):
+    os.utime(path, (seconds, seconds))
+
+
+@pytest.fixture
+def model_files(tmp_path, monkeypatch):
+    json_path = str(tmp_path / "crop_yield_model.json")
+    ubj_path = str(tmp_path / "crop_yield_model.ubj")
+    shutil.copy(os.environ["MODEL_PATH"], json_path)
+    monkeypatch.setattr(server, "MODEL_PATH_OVERRIDE", None)
+    monkeypatch.setattr(server, "MODEL_JSON_PATH", json_path)
+    monkeypatch.setattr(server, "MODEL_UBJ_PATH", ubj_path)
+    return json_path, ubj_path
+
+
+def test_json_used_without_ubj(model_files):
+    json_path, _ = model_files
+    assert server.resolve_model_path() == json_path
+
+
+def test_ubj_used_when_at_least_as_new(model_files):
+    json_path, ubj_path = model_files
+    convert_model(json_path, ubj_path)
+    set_mtime(json_path, 1_000_000)
+    set_mtime(ubj_path, 1_000_000)
+    assert server.resolve_model_path() == ubj_path
+
+
+def test_newer_json_wins_over_stale_ubj(model_files):
+    json_path, ubj_path = model_files
+    convert_model(json_path, ubj_path)
+    set_mtime(ubj_path, 1_000_000)
+    set_mtime(json_path, 2_000_000)
+    assert server.resolve_model_path() == json_path
+
+
+def test_explicit_model_path_wins(model_files, monkeypatch):
+    _, ubj_path = model_files
+    monkeypatch.setattr(server, "MODEL_PATH_OVERRIDE", "/models/pinned.json")
+    assert server.resolve_model_path() == "/models/pinned.json"
+
+
+def test_watcher_switches_to_newer_json(model_files, monkeypatch):
+    json_path, ubj_path = model_files
+    convert_model(json_path, ubj_path)
+    set_mtime(json_path, 1_000_000)
+    set_mtime(ubj_path, 2_000_000)
+
+    registry = server.model_registry
+    monkeypatch.setattr(registry, "path", ubj_path)
+    for attr in ("active", "_history", "_file_state"):
+        monkeypatch.setattr(registry, attr, getattr(registry, attr))
+    monkeypatch.setattr(server, "MODEL_FILE_CHECK_INTERVAL", 0)
+    registry.load_and_activate()
+    assert registry.active.path == ubj_path
+
+    # A retrained JSON is deployed after the conversion
+    set_mtime(json_path, 3_000_000)
+
+    async def check():
+        server.reload_model_if_file_changed()
+        await asyncio.gather(*server._background_tasks)
+
+    asyncio.run(check())
+    assert registry.path == json_path
+    assert registry.active.path == json_path
@@ -0,0 +1,72 @@
+# tests/test_model_registry.py
+import asyncio
+import os
+import shutil
+import threading
+
+import pytest
+
+from model_registry import ModelRegistry, ReloadInProgress
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "model.json"
+    shutil.copy(os.environ["MODEL_PATH"], path)
+    return str(path)
+
+
+def bump_mtime(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10**9))
+
+
+def test_broken_file_is_not_retried_until_it_changes(model_file):
+    registry = ModelRegistry(model_file)
+    good = registry.load_and_activate()
+    assert not registry.file_changed()
+
+    with open(model_file, "w") as f:
+        f.write("not a model")
+    bump_mtime(model_file)
+    assert registry.file_changed()
+    with pytest.raises(Exception):
+        registry.load_and_activate()
+
+    # The failed attempt is remembered; the old model stays active
+    assert not registry.file_changed()
+    assert registry.active is good
+
+    bump_mtime(model_file)
+    assert registry.file_changed()
+
+
+def test_concurrent_reloads_coalesce_only_for_the_same_path(model_file, tmp_path):
+    other = str(tmp_path / "other.json")
+    shutil.copy(model_file, other)
+    registry = ModelRegistry(model_file)
+
+    async def scenario():
+        first = asyncio.ensure_future(registry.reload())
+        await asyncio.sleep(0)
+        same = asyncio.ensure_future(registry.reload(model_file))
+        with pytest.raises(ReloadInProgress):
+            await registry.reload(other)
+        return await first, await same
+
+    first, same = asyncio.run(scenario())
+    assert first is same
+    assert registry.active is first
+    assert asyncio.run(registry.reload(other)).path == other
+
+
+def test_reload_activates_on_the_event_loop_thread(model_file):
+    seen = []
+    registry = ModelRegistry(model_file, on_activate=lambda model: seen.append(threading.get_ident()))
+
+    async def scenario():
+        await registry.reload()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert seen == [loop_thread]
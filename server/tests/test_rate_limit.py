@@ -0,0 +1,167 @@
+# tests/test_rate_limit.py
+import asyncio
+import ipaddress
+
+import httpx
+import pytest
+
+import app as server
+from rate_limit import ConcurrencyLimit, MemoryBucketBackend, RateLimiter
+
+ROW = {
+    "Crop": "Rice", "State": "Punjab", "Year": 2024, "N": 40.0, "P": 20.0, "K": 30.0, "pH": 6.5,
+    "soil_type": "Loamy", "Fertilizer_Type": "Organic", "Fertilizer_Amount": 40.0,
+    "Pesticide_Amount": 3.0, "sowing_date": "2024-06-01", "area": 2.0,
+}
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    """Turn admission on with fresh buckets; the route dependencies hold the limiter objects themselves."""
+    monkeypatch.setattr(server, "RATE_LIMIT_ENABLED", True)
+    backend = MemoryBucketBackend()
+    for limiter in (server.predict_rate_limiter, server.batch_rows_rate_limiter):
+        monkeypatch.setattr(limiter, "backend", backend)
+    for concurrency in (server.predict_concurrency, server.batch_rows_concurrency):
+        monkeypatch.setattr(concurrency, "_semaphore", asyncio.Semaphore(concurrency.limit))
+        monkeypatch.setattr(concurrency, "in_flight", 0)
+
+    async def fallback(state):
+        return dict(server.WEATHER_FALLBACK)
+    monkeypatch.setattr(server, "fetch_weather", fallback)
+
+
+def call(method, url, **kwargs):
+    async def send():
+        transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+    return asyncio.run(send())
+
+
+def test_requests_over_the_burst_get_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(server.predict_rate_limiter, "rate", 0.25)
+    monkeypatch.setattr(server.predict_rate_limiter, "burst", 2)
+
+    statuses = [call("POST", "/predict_yield", json=ROW).status_code for _ in range(2)]
+    limited = call("POST", "/predict_yield", json=ROW)
+
+    assert statuses == [200, 200]
+    assert limited.status_code == 429
+    # One token at 0.25/s is four seconds away
+    assert limited.headers["Retry-After"] == "4"
+    assert server.predict_concurrency.in_flight == 0
+
+
+def test_busy_route_gets_429_and_releases_its_slot(monkeypatch):
+    monkeypatch.setattr(server.predict_concurrency, "_semaphore", asyncio.Semaphore(1))
+    monkeypatch.setattr(server.predict_concurrency, "wait", 0)
+    release = None
+    entered = None
+
+    async def slow_predict(input_data, weather_data):
+        entered.set()
+        await release.wait()
+        return 1.0, "v"
+    monkeypatch.setattr(server, "predict_single", slow_predict)
+
+    async def main():
+        nonlocal release, entered
+        release, entered = asyncio.Event(), asyncio.Event()
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.post("/predict_yield", json=ROW))
+            await entered.wait()
+            busy = await client.post("/predict_yield", json=ROW)
+            release.set()
+            return (await first).status_code, busy
+
+    first, busy = asyncio.run(main())
+    assert first == 200
+    assert busy.status_code == 429 and busy.headers["Retry-After"] == "1"
+    assert server.predict_concurrency.in_flight == 0
+
+
+def test_slot_is_released_when_the_handler_fails(monkeypatch):
+    monkeypatch.setattr(server.batch_rows_concurrency, "_semaphore", asyncio.Semaphore(1))
+
+    def broken(*args):
+        raise RuntimeError("scoring failed")
+    monkeypatch.setattr(server, "score_batch", broken)
+
+    for _ in range(3):
+        assert call("POST", "/predict_yield/batch", json=[ROW]).status_code == 500
+        assert server.batch_rows_concurrency.in_flight == 0
+
+    async def predict_failed(input_data, weather_data):
+        raise ValueError("model failed")
+    monkeypatch.setattr(server, "predict_single", predict_failed)
+    assert call("POST", "/predict_yield", json=ROW).status_code == 400
+    assert server.predict_concurrency.in_flight == 0
+
+
+def test_batch_is_charged_per_row(monkeypatch):
+    monkeypatch.setattr(server.batch_rows_rate_limiter, "rate", 0.01)
+    monkeypatch.setattr(server.batch_rows_rate_limiter, "burst", 5)
+
+    assert call("POST", "/predict_yield/batch", json=[ROW] * 3).status_code == 200
+    limited = call("POST", "/predict_yield/batch", json=[ROW] * 3)
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) > 1
+    assert server.batch_rows_concurrency.in_flight == 0
+    # The refused batch still spent its admission token, leaving one for a single row
+    assert call("POST", "/predict_yield/batch", json=[ROW]).status_code == 200
+
+
+def test_forwarded_for_is_only_trusted_from_configured_proxies(monkeypatch):
+    monkeypatch.setattr(server.predict_rate_limiter, "rate", 0.01)
+    monkeypatch.setattr(server.predict_rate_limiter, "burst", 1)
+
+    def post(forwarded):
+        return call("POST", "/predict_yield", json=ROW, headers={"X-Forwarded-For": forwarded}).status_code
+
+    # Not behind a trusted proxy: the header is ignored and both share the peer's bucket
+    monkeypatch.setattr(server, "RATE_LIMIT_TRUSTED_PROXIES", [])
+    assert [post("203.0.113.1"), post("203.0.113.2")] == [200, 429]
+
+    # The test client connects from 127.0.0.1; trusting it gives each forwarded client its own bucket
+    monkeypatch.setattr(server, "RATE_LIMIT_TRUSTED_PROXIES", [ipaddress.ip_network("127.0.0.0/8"),
+                                                               ipaddress.ip_network("10.0.0.0/8")])
+    assert [post("203.0.113.1"), post("203.0.113.2")] == [200, 200]
+    # A spoofed left-most hop doesn't help: the right-most untrusted hop is the client
+    assert post("198.51.100.7, 203.0.113.1, 10.1.2.3") == 429
+
+
+def test_limiter_cost_and_retry_after():
+    limiter = RateLimiter("test", MemoryBucketBackend(), rate=10, burst=5)
+
+    async def main():
+        return [await limiter.take("a", cost) for cost in (3, 3, 2)]
+
+    (ok1, _), (ok2, retry), (ok3, _) = asyncio.run(main())
+    assert ok1 and not ok2 and ok3
+    assert retry == pytest.approx(0.1, abs=0.01)
+
+
+def test_cost_above_burst_waits_for_a_full_bucket():
+    limiter = RateLimiter("test", MemoryBucketBackend(), rate=1, burst=5)
+
+    async def main():
+        return await limiter.take("a", 50), await limiter.take("a", 50)
+
+    (first, _), (second, retry) = asyncio.run(main())
+    assert first and not second
+    assert retry == pytest.approx(5, abs=0.01)
+
+
+def test_concurrency_limit_refuses_without_waiting_and_counts():
+    async def main():
+        limit = ConcurrencyLimit(1, wait=0)
+        assert await limit.acquire()
+        refused = await limit.acquire()
+        limit.release()
+        return refused, await limit.acquire(), limit.stats()
+
+    refused, reacquired, stats = asyncio.run(main())
+    assert refused is False and reacquired is True
+    assert stats == {"limit": 1, "in_flight": 1, "rejected": 1}
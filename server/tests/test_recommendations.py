@@ -0,0 +1,98 @@
+# tests/test_recommendations.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import recommendations as rec
+from recommendations import make_rng, recommend_batch, recommend_row
+
+BASE = {"N": 60, "P": 30, "K": 40, "pH": 6.5, "Rainfall": 500, "Temp": 25, "Humidity": 60,
+        "Fertilizer_Amount": 60, "Pesticide_Amount": 10, "predicted_yield": 70,
+        "Fertilizer_Type": "Organic"}
+
+
+def legacy_groups(row):
+    """Message groups the original if/elif chain in generate_recommendations chose."""
+    groups = []
+    groups.append(rec.N_VERY_LOW if row["N"] < 30 else rec.N_LOW if row["N"] < 50 else rec.N_OK)
+    groups.append(rec.P_VERY_LOW if row["P"] < 15 else rec.P_LOW if row["P"] < 25 else rec.P_OK)
+    groups.append(rec.K_VERY_LOW if row["K"] < 20 else rec.K_LOW if row["K"] < 35 else rec.K_OK)
+    groups.append(rec.PH_ACIDIC if row["pH"] < 6.0 else rec.PH_ALKALINE if row["pH"] > 7.5 else rec.PH_OK)
+    groups.append(rec.RAIN_LOW if row["Rainfall"] < 200 else rec.RAIN_HIGH if row["Rainfall"] > 800
+                  else rec.RAIN_OK)
+    groups.append(rec.TEMP_HIGH if row["Temp"] > 35 else rec.TEMP_LOW if row["Temp"] < 15 else rec.TEMP_OK)
+    groups.append(rec.HUMIDITY_HIGH if row["Humidity"] > 80 else rec.HUMIDITY_LOW if row["Humidity"] < 50
+                  else rec.HUMIDITY_OK)
+    if row["Fertilizer_Amount"] < 50:
+        groups.append(tuple(m.format(**row) for m in rec.FERTILIZER_LOW))
+    if row["Pesticide_Amount"] < 5:
+        groups.append(rec.PESTICIDE_LOW)
+    groups.append(rec.YIELD_EXCELLENT if row["predicted_yield"] > 80 else rec.YIELD_MODERATE
+                  if row["predicted_yield"] > 50 else rec.YIELD_POOR)
+    return groups
+
+
+def around(value):
+    return [np.nextafter(value, -np.inf), value, np.nextafter(value, np.inf)]
+
+
+# Every threshold, exactly and one ulp either side
+BOUNDARY_ROWS = [
+    dict(BASE, **{field: v})
+    for field, thresholds in [("N", [30, 50]), ("P", [15, 25]), ("K", [20, 35]), ("pH", [6.0, 7.5]),
+                              ("Rainfall", [200, 800]), ("Temp", [15, 35]), ("Humidity", [50, 80]),
+                              ("Fertilizer_Amount", [50]), ("Pesticide_Amount", [5]),
+                              ("predicted_yield", [50, 80])]
+    for threshold in thresholds
+    for v in around(float(threshold))
+]
+
+
+def assert_matches_legacy(row, messages):
+    groups = legacy_groups(row)
+    assert len(messages) == len(groups)
+    for message, group in zip(messages, groups):
+        assert message in group
+
+
+@pytest.mark.parametrize("row", BOUNDARY_ROWS,
+                         ids=[f"{k}={r[k]!r}" for r in BOUNDARY_ROWS for k in r if r[k] != BASE[k]])
+def test_row_matches_legacy_thresholds(row):
+    assert_matches_legacy(row, recommend_row(row, make_rng(0)))
+
+
+def test_batch_matches_legacy_thresholds():
+    batch = recommend_batch(pd.DataFrame(BOUNDARY_ROWS), make_rng(0))
+    for row, messages in zip(BOUNDARY_ROWS, batch):
+        assert_matches_legacy(row, messages)
+
+
+def random_frame(count=500, seed=1):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "N": rng.uniform(0, 100, count), "P": rng.uniform(0, 50, count), "K": rng.uniform(0, 60, count),
+        "pH": rng.uniform(4, 9, count), "Rainfall": rng.uniform(0, 1200, count),
+        "Temp": rng.uniform(0, 45, count), "Humidity": rng.uniform(20, 100, count),
+        "Fertilizer_Amount": rng.uniform(0, 100, count), "Pesticide_Amount": rng.uniform(0, 10, count),
+        "predicted_yield": rng.uniform(0, 120, count),
+        "Fertilizer_Type": rng.choice(["Organic", "Inorganic"], count),
+    })
+
+
+def test_batch_matches_rows_drawn_from_the_same_generator():
+    frame = pd.concat([random_frame(), pd.DataFrame(BOUNDARY_ROWS)], ignore_index=True)
+    rows = frame.to_dict(orient="records")
+    shared = make_rng(42)
+    assert recommend_batch(frame, make_rng(42)) == [recommend_row(row, shared) for row in rows]
+
+
+def test_seeded_row_and_batch_agree(monkeypatch):
+    monkeypatch.setattr(rec, "RECOMMENDATION_SEED", "7")
+    frame = random_frame(200)
+    rows = frame.to_dict(orient="records")
+
+    batch = recommend_batch(frame)
+    assert batch == [recommend_row(row) for row in rows]
+    # Same input -> same messages, call after call
+    assert recommend_batch(frame) == batch
+    assert recommend_row(rows[3]) == batch[3]
@@ -0,0 +1,39 @@
+# tests/test_score_yield.py
+import os
+
+import pandas as pd
+import pytest
+
+import score_yield
+
+ROW = {
+    "Crop": "Rice", "State": "Punjab", "Year": 2024, "N": 40.0, "P": 20.0, "K": 30.0, "pH": 6.5,
+    "soil_type": "Loamy", "Fertilizer_Type": "Organic", "Fertilizer_Amount": 40.0,
+    "Pesticide_Amount": 3.0, "sowing_date": "2024-06-01", "area": 2.0,
+}
+
+
+def plots_frame(count=20):
+    # object dtype so single cells can be made invalid
+    return pd.DataFrame([dict(ROW, N=10.0 + i) for i in range(count)]).astype(object)
+
+
+@pytest.mark.parametrize("invalid_rows", [[10], list(range(10))], ids=["bad-row-in-later-chunk", "first-chunk-all-bad"])
+def test_parquet_output_schema_is_stable_across_chunks(tmp_path, invalid_rows):
+    frame = plots_frame()
+    frame.loc[invalid_rows, "N"] = "not a number"
+    input_path = tmp_path / "plots.csv"
+    output_path = tmp_path / "scored.parquet"
+    frame.to_csv(input_path, index=False)
+
+    summary = score_yield.score_file(str(input_path), str(output_path), os.environ["MODEL_PATH"], chunk_size=10)
+
+    assert summary == {"rows": 20, "failed": len(invalid_rows), "seconds": summary["seconds"]}
+    scored = pd.read_parquet(output_path)
+    assert len(scored) == 20
+    assert scored["error"].notna().sum() == len(invalid_rows)
+    assert scored.loc[invalid_rows, "predicted_yield_kgha"].isna().all()
+    valid = scored.drop(index=invalid_rows)
+    assert valid["predicted_yield_kgha"].notna().all()
+    assert valid["recommendations"].notna().all()
+    assert str(scored["predicted_yield_kgha"].dtype) == "float64"
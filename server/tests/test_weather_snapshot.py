@@ -0,0 +1,120 @@
+# tests/test_weather_snapshot.py
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import app as server
+import weather_snapshot as snapshot_module
+from weather_snapshot import WeatherSnapshot
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(snapshot_module, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+class Upstream:
+    def __init__(self):
+        self.temps = {"Lucknow": 30, "Mumbai": 28}
+        self.down = set()
+
+    async def fetch(self, city):
+        if city in self.down:
+            raise ConnectionError(f"{city} unavailable")
+        return {"Temp": self.temps[city], "Humidity": 60, "Rainfall": 0}
+
+
+def test_failed_city_keeps_last_known_good(clock):
+    upstream = Upstream()
+    snapshot = WeatherSnapshot(upstream.temps, upstream.fetch)
+    asyncio.run(snapshot.refresh())
+
+    upstream.temps = {"Lucknow": 35, "Mumbai": 31}
+    upstream.down = {"Mumbai"}
+    clock.now += 600
+    assert asyncio.run(snapshot.refresh()) == 1
+
+    assert snapshot.get("Lucknow")["Temp"] == 35
+    assert snapshot.get("Mumbai")["Temp"] == 28
+    assert snapshot.failures == 1 and "Mumbai" in snapshot.last_error
+
+
+def test_entries_past_max_age_are_not_served(clock):
+    upstream = Upstream()
+    snapshot = WeatherSnapshot(upstream.temps, upstream.fetch, max_age=3600)
+    asyncio.run(snapshot.refresh())
+
+    clock.now += 3600
+    assert snapshot.get("Lucknow")["Temp"] == 30
+    clock.now += 1
+    assert snapshot.get("Lucknow") is None
+    assert snapshot.too_old == 1
+
+    # A successful refresh makes the city servable again
+    asyncio.run(snapshot.refresh())
+    assert snapshot.get("Lucknow")["Temp"] == 30
+
+
+def test_no_max_age_serves_any_age(clock):
+    upstream = Upstream()
+    snapshot = WeatherSnapshot(upstream.temps, upstream.fetch)
+    asyncio.run(snapshot.refresh())
+    clock.now += 30 * 86400
+    assert snapshot.get("Mumbai")["Temp"] == 28
+
+
+def test_snapshot_persists_and_loads(tmp_path, clock):
+    path = str(tmp_path / "weather.json")
+    upstream = Upstream()
+    asyncio.run(WeatherSnapshot(upstream.temps, upstream.fetch, persist_path=path).refresh())
+
+    restarted = WeatherSnapshot(upstream.temps, upstream.fetch, persist_path=path, max_age=3600)
+    assert restarted.load() == 2
+    assert restarted.get("Lucknow") == {"Temp": 30, "Humidity": 60, "Rainfall": 0}
+    assert restarted.snapshot["Lucknow"]["fetched_at"] == clock.now
+
+    # Loaded entries keep their original fetch time, so an old file is not served
+    clock.now += 3601
+    assert restarted.get("Lucknow") is None
+
+
+def test_unreadable_or_missing_snapshot_file_is_ignored(tmp_path):
+    path = tmp_path / "weather.json"
+    snapshot = WeatherSnapshot(["Lucknow"], Upstream().fetch, persist_path=str(path))
+    assert snapshot.load() == 0
+
+    path.write_text(json.dumps({"cities": {"Lucknow": {"weather": {"Temp": 1}}}}))
+    assert snapshot.load() == 0
+    assert snapshot.get("Lucknow") is None
+
+
+def test_fetch_weather_goes_live_when_snapshot_is_too_old(monkeypatch, clock):
+    upstream = Upstream()
+    snapshot = WeatherSnapshot(upstream.temps, upstream.fetch, max_age=3600)
+    asyncio.run(snapshot.refresh())
+    monkeypatch.setattr(server, "weather_snapshot", snapshot)
+    monkeypatch.setattr(server, "weather_cache", server.AsyncTTLCache(ttl=600))
+    monkeypatch.setattr(server, "OPENWEATHER_KEY", "test-key")
+    live = []
+
+    async def fetch_live(city):
+        live.append(city)
+        return {"Temp": 99, "Humidity": 60, "Rainfall": 0}
+    monkeypatch.setattr(server, "fetch_weather_upstream", fetch_live)
+
+    assert asyncio.run(server.fetch_weather("Uttar Pradesh"))["Temp"] == 30
+    clock.now += 3601
+    assert asyncio.run(server.fetch_weather("Uttar Pradesh"))["Temp"] == 99
+    assert live == ["Lucknow"]
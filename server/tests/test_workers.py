@@ -0,0 +1,37 @@
+# tests/test_workers.py
+import asyncio
+import threading
+
+import pytest
+
+from workers import BoundedExecutor, ExecutorSaturated
+
+
+def test_cancelled_caller_keeps_slot_until_job_finishes():
+    release = threading.Event()
+
+    async def scenario():
+        executor = BoundedExecutor("test", max_workers=1, max_queue=0).start()
+        try:
+            waiter = asyncio.create_task(executor.submit(release.wait, 5))
+            await asyncio.sleep(0.05)
+            waiter.cancel()
+            await asyncio.sleep(0.05)
+
+            # The job is still running, so the pool is still full
+            assert executor.in_flight == 1
+            with pytest.raises(ExecutorSaturated):
+                await executor.submit(lambda: None)
+
+            release.set()
+            for _ in range(100):
+                if executor.in_flight == 0:
+                    break
+                await asyncio.sleep(0.01)
+            assert executor.in_flight == 0
+            assert await executor.submit(lambda: 42) == 42
+        finally:
+            release.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
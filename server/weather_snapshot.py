@@ -0,0 +1,150 @@
+# weather_snapshot.py
+# Weather for a fixed set of cities, refreshed in the background and read
+# by requests without any I/O.
+import asyncio
+import json
+import os
+import time
+from types import MappingProxyType
+
+
+class WeatherSnapshot:
+    """Periodically fetch weather for every city and publish an immutable snapshot.
+
+    Each refresh fetches all cities concurrently and builds a new read-only
+    mapping, which replaces the old one in a single assignment; readers never
+    see a half-updated table. A city whose fetch fails keeps its previous
+    entry, so upstream outages serve last-known-good data. With persist_path
+    set, every successful refresh is written to disk and loaded on start, so
+    a restarted process can answer before its first refresh completes.
+    Entries older than max_age seconds (if set) are not served, so a long
+    outage or an old persisted file sends callers back to a live fetch.
+    """
+
+    def __init__(self, cities, fetch, interval=600, concurrency=8, persist_path=None, max_age=None):
+        self.cities = sorted(set(cities))
+        self.fetch = fetch
+        self.interval = interval
+        self.concurrency = concurrency
+        self.persist_path = persist_path
+        self.max_age = max_age
+
+        # city -> read-only {"weather": {...}, "fetched_at": epoch seconds}
+        self.snapshot = MappingProxyType({})
+        self._task = None
+
+        self.refreshes = 0
+        self.failures = 0
+        self.too_old = 0
+        self.last_refresh = None
+        self.last_error = None
+
+    def get(self, city):
+        """Weather for city from the current snapshot (a copy), or None if missing or too old."""
+        entry = self.snapshot.get(city)
+        if entry is None:
+            return None
+        if self.max_age and time.time() - entry["fetched_at"] > self.max_age:
+            self.too_old += 1
+            return None
+        return dict(entry["weather"])
+
+    async def refresh(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch_one(city):
+            async with semaphore:
+                return await self.fetch(city)
+
+        results = await asyncio.gather(*(fetch_one(city) for city in self.cities), return_exceptions=True)
+
+        now = time.time()
+        updated = dict(self.snapshot)
+        fetched = 0
+        for city, result in zip(self.cities, results):
+            if isinstance(result, Exception):
+                self.failures += 1
+                self.last_error = f"{city}: {result}"
+                continue
+            updated[city] = MappingProxyType({"weather": MappingProxyType(dict(result)), "fetched_at": now})
+            fetched += 1
+
+        self.snapshot = MappingProxyType(updated)
+        self.refreshes += 1
+        self.last_refresh = now
+        if fetched and self.persist_path:
+            try:
+                await asyncio.to_thread(self.save)
+            except OSError as e:
+                print("Could not persist weather snapshot:", e)
+        return fetched
+
+    def save(self):
+        cities = {city: {"weather": dict(entry["weather"]), "fetched_at": entry["fetched_at"]}
+                  for city, entry in self.snapshot.items()}
+        tmp = self.persist_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"saved_at": time.time(), "cities": cities}, f)
+        os.replace(tmp, self.persist_path)
+
+    def load(self):
+        """Seed the snapshot from persist_path; returns the number of cities loaded."""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return 0
+        try:
+            with open(self.persist_path) as f:
+                cities = json.load(f)["cities"]
+            self.snapshot = MappingProxyType({
+                city: MappingProxyType({"weather": MappingProxyType(dict(entry["weather"])),
+                                        "fetched_at": float(entry["fetched_at"])})
+                for city, entry in cities.items()
+            })
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print("Ignoring unreadable weather snapshot:", e)
+            return 0
+        return len(self.snapshot)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.last_error = str(e)
+                print("Weather refresh failed:", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self.load()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def oldest_age(self):
+        if not self.snapshot:
+            return None
+        return time.time() - min(entry["fetched_at"] for entry in self.snapshot.values())
+
+    def stats(self):
+        age = self.oldest_age()
+        return {
+            "running": self._task is not None,
+            "cities": len(self.cities),
+            "available": len(self.snapshot),
+            "interval_seconds": self.interval,
+            "max_age_seconds": self.max_age,
+            "oldest_age_seconds": round(age, 1) if age is not None else None,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "too_old": self.too_old,
+            "last_error": self.last_error,
+            "persist_path": self.persist_path,
+        }
@@ -0,0 +1,43 @@
+# weather_stub.py
+# Local stand-in for the OpenWeather "current weather" API, for tests and benchmarks.
+#
+#   uvicorn weather_stub:app --port 8081
+#   OPENWEATHER_URL=http://127.0.0.1:8081/data/2.5/weather OPENWEATHER_KEY=stub uvicorn app:app
+import asyncio
+import os
+import zlib
+
+from fastapi import FastAPI
+
+# Artificial upstream latency, to mimic a real network call
+WEATHER_STUB_DELAY_MS = float(os.getenv("WEATHER_STUB_DELAY_MS", 0))
+
+app = FastAPI(title="OpenWeather Stub")
+app.state.requests = 0
+
+
+@app.get("/data/2.5/weather")
+async def current_weather(q: str, appid: str = "", units: str = "metric"):
+    app.state.requests += 1
+    if WEATHER_STUB_DELAY_MS:
+        await asyncio.sleep(WEATHER_STUB_DELAY_MS / 1000)
+
+    # Deterministic per city so results are reproducible
+    seed = zlib.crc32(q.lower().encode())
+    return {
+        "cod": 200,
+        "name": q,
+        "main": {"temp": 15 + seed % 25, "humidity": 30 + seed % 60},
+        "rain": {"1h": seed % 5},
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return {"requests": app.state.requests}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("WEATHER_STUB_PORT", 8081)))
@@ -0,0 +1,116 @@
+# workers.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a BoundedExecutor already holds as much work as it may queue."""
+
+
+def _timed_call(fn, args, kwargs):
+    # Runs in the worker; module-level so process pools can pickle it
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+class BoundedExecutor:
+    """Thread or process pool with a bounded backlog for CPU-bound work.
+
+    At most max_workers jobs run at once and at most max_queue more wait;
+    submit() raises ExecutorSaturated beyond that so callers can shed load
+    instead of piling requests up behind the pool.
+    """
+
+    def __init__(self, name, max_workers, max_queue, kind="thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = None
+        # Counters are updated from pool threads when jobs finish
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.service_time_total = 0.0
+        self.service_time_max = 0.0
+        self.wait_time_total = 0.0
+
+    def start(self):
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix=self.name)
+        return self
+
+    def shutdown(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+    @property
+    def queue_depth(self):
+        return max(0, self.in_flight - self.max_workers)
+
+    async def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(f"{self.name} executor is saturated")
+            self.in_flight += 1
+            self.submitted += 1
+
+        self.start()
+        start = time.perf_counter()
+        try:
+            future = self._pool.submit(_timed_call, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+                self.failed += 1
+            raise
+        # The slot is freed when the job itself finishes, not when the caller
+        # stops waiting: a cancelled request must not free a slot whose job
+        # is still running in the pool.
+        future.add_done_callback(lambda f: self._job_done(f, start))
+
+        result, _ = await asyncio.wrap_future(future)
+        return result
+
+    def _job_done(self, future, start):
+        with self._lock:
+            self.in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+                return
+            _, service_time = future.result()
+            self.completed += 1
+            self.service_time_total += service_time
+            self.service_time_max = max(self.service_time_max, service_time)
+            self.wait_time_total += max(0.0, time.perf_counter() - start - service_time)
+
+    def stats(self):
+        done = self.completed or 1
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_service_ms": round(self.service_time_total / done * 1000, 3),
+            "max_service_ms": round(self.service_time_max * 1000, 3),
+            "avg_wait_ms": round(self.wait_time_total / done * 1000, 3),
+        }